@@ -2,12 +2,12 @@
 
 import re
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 from .utils import log_message
 
 
-@dataclass
+@dataclass(slots=True)
 class Chapter:
     """Represents a chapter in the novel."""
     number: int
@@ -18,80 +18,111 @@ class Chapter:
         return f"Chapter({self.number}, '{self.title[:30]}...', {len(self.text)} chars)"
 
 
-# Main chapter pattern - case insensitive, multiline
+# Main chapter pattern - multiline, case handled per letter
 # Matches: Chương 1: Title, CHƯƠNG 1 - Title, Chương 1：Title, Chương 1. Title, etc.
 # Also matches: Chương 1 (without separator/title) for plain chapter headers
+# Leading whitespace may be any non-newline space (pypdf emits NBSP, CJK
+# text U+3000); case is spelled out per letter rather than re.IGNORECASE.
 CHAPTER_PATTERN = re.compile(
-    r'^\s*chương\s+(\d{1,5})\s*(?:[:：.\-–—]\s*(.+?))?\s*$',
-    re.IGNORECASE | re.MULTILINE
+    r'^[^\S\n]*[Cc][Hh][Ưư][Ơơ][Nn][Gg]\s+(\d{1,5})\s*(?:[:：.\-–—]\s*(.+?))?\s*$',
+    re.MULTILINE
 )
 
+# Every case variant of the "ươ" inside the keyword; if none occurs in the
+# text, CHAPTER_PATTERN cannot match and the regex scan can be skipped
+_CHAPTER_KEYWORD_HINTS = ('ươ', 'ƯƠ', 'Ươ', 'ưƠ')
 
-def split_into_chapters(text: str) -> List[Chapter]:
+
+def _strip_span(text: str, lo: int, hi: int) -> Tuple[int, int]:
+    """Narrow [lo, hi) past leading/trailing whitespace without copying text."""
+    while lo < hi and text[lo].isspace():
+        lo += 1
+    while hi > lo and text[hi - 1].isspace():
+        hi -= 1
+    return lo, hi
+
+
+def _make_chapter(match: re.Match, end_pos: int, text: str) -> Chapter:
+    """Build a Chapter from a heading match and the offset where its body ends."""
+    chapter_num = int(match.group(1))
+    # Handle optional title (group 2 may be None for "Chương N" without separator)
+    chapter_title = (match.group(2) or f"Chương {chapter_num}").strip()
+    
+    # Slice once at the stripped offsets instead of slice-then-strip
+    lo, hi = _strip_span(text, match.end(), end_pos)
+    
+    return Chapter(
+        number=chapter_num,
+        title=chapter_title,
+        text=text[lo:hi]
+    )
+
+
+def iter_chapters(text: str) -> Iterator[Chapter]:
     """
-    Split text into chapters based on chapter headings.
+    Lazily yield chapters from text based on chapter headings.
+    
+    Only the heading matches are collected up front (so the count can be
+    reported); each chapter's text is sliced as it is consumed.
     
     Args:
         text: Preprocessed novel text
         
-    Returns:
-        List of Chapter objects
+    Yields:
+        Chapter objects in document order
     """
     log_message("Splitting text into chapters...")
     
-    # Find all chapter headings
-    matches = list(CHAPTER_PATTERN.finditer(text))
+    # Cheap substring probe before running the regex over the whole text
+    if any(hint in text for hint in _CHAPTER_KEYWORD_HINTS):
+        matches = list(CHAPTER_PATTERN.finditer(text))
+    else:
+        matches = []
     
     if not matches:
         log_message("WARNING: No chapter headings found! Using entire text as single chapter.")
-        return [Chapter(
+        yield Chapter(
             number=1,
             title="Toàn bộ nội dung",
             text=text.strip()
-        )]
+        )
+        return
     
     log_message(f"Found {len(matches)} chapter headings")
     
-    chapters: List[Chapter] = []
-    total_matches = len(matches)
-    
-    for i, match in enumerate(matches):
-        chapter_num = int(match.group(1))
-        # Handle optional title (group 2 may be None for "Chương N" without separator)
-        chapter_title = (match.group(2) or f"Chương {chapter_num}").strip()
-        
-        # Get text from end of this heading to start of next heading (or end of text)
-        start_pos = match.end()
-        if i + 1 < len(matches):
-            end_pos = matches[i + 1].start()
-        else:
-            end_pos = len(text)
-        
-        chapter_text = text[start_pos:end_pos].strip()
-        
-        chapters.append(Chapter(
-            number=chapter_num,
-            title=chapter_title,
-            text=chapter_text
-        ))
-        
-        # Only log progress every 50 chapters to avoid I/O overhead
-        if (i + 1) % 50 == 0 or i == total_matches - 1:
-            log_message(f"Processed {i + 1}/{total_matches} chapters...")
-    
     # Check for text before first chapter
-    first_match = matches[0]
-    prologue_text = text[:first_match.start()].strip()
+    prologue_text = text[:matches[0].start()].strip()
     if prologue_text and len(prologue_text) > 100:
         log_message(f"Found prologue/intro text before Chapter 1 ({len(prologue_text)} chars)")
-        # Insert prologue as Chapter 0
-        chapters.insert(0, Chapter(
+        # Emit prologue as Chapter 0
+        yield Chapter(
             number=0,
             title="Mở đầu",
             text=prologue_text
-        ))
+        )
+    
+    total_matches = len(matches)
+    for i, match in enumerate(matches):
+        # Text runs from end of this heading to start of the next (or end of text)
+        end_pos = matches[i + 1].start() if i + 1 < total_matches else len(text)
+        yield _make_chapter(match, end_pos, text)
+        
+        # Only log progress every 50 chapters to avoid I/O overhead
+        if (i + 1) % 50 == 0 or i == total_matches - 1:
+            log_message(f"Processed {i + 1}/{total_matches} chapters...")
+
+
+def split_into_chapters(text: str) -> List[Chapter]:
+    """
+    Split text into chapters based on chapter headings.
     
-    return chapters
+    Args:
+        text: Preprocessed novel text
+        
+    Returns:
+        List of Chapter objects
+    """
+    return list(iter_chapters(text))
 
 
 def validate_chapters(chapters: List[Chapter]) -> List[str]:
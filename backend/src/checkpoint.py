@@ -1,13 +1,34 @@
 """Checkpoint management for resume support."""
 
 import json
+import os
 from pathlib import Path
-from typing import Dict, List, Set, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Set, Optional, TextIO
+from dataclasses import dataclass
 from datetime import datetime
 
 from .utils import calculate_file_hash, get_file_size, ensure_dir, log_message
 
+# orjson is an optional speedup; fall back to stdlib json when unavailable
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    """Serialize obj to indented UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(data: bytes):
+    """Parse UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 @dataclass
 class CheckpointData:
@@ -23,17 +44,30 @@ class CheckpointData:
     updated_at: str
     chunks_done: List[str]
     total_chunks: int
+    input_mtime_ns: int = 0  # Lets resume skip re-hashing an unchanged input
+    chunker_version: int = 0  # Checkpoints older than versioning load as 0
     
     def to_dict(self) -> dict:
-        return asdict(self)
+        # Fields are flat, so a shallow copy is enough (asdict deep-copies chunks_done)
+        return {**self.__dict__}
     
     @classmethod
     def from_dict(cls, data: dict) -> "CheckpointData":
         return cls(**data)
 
 
+# Number of chunks appended to the WAL between full checkpoint.json snapshots
+WAL_COMPACT_EVERY = 100
+
+
 class CheckpointManager:
-    """Manages checkpoint saving and loading for resume functionality."""
+    """
+    Manages checkpoint saving and loading for resume functionality.
+    
+    Completed chunk IDs are appended one per line to a write-ahead log
+    (checkpoint.wal) instead of rewriting checkpoint.json per chunk; the
+    JSON snapshot is refreshed every WAL_COMPACT_EVERY chunks and on close().
+    """
     
     def __init__(self, checkpoint_path: Path, chunks_dir: Path):
         """
@@ -48,6 +82,9 @@ class CheckpointManager:
         self._data: Optional[CheckpointData] = None
         self._chunks_done: Set[str] = set()
         self._dirs_ensured: bool = False  # Cache to avoid repeated ensure_dir calls
+        self.wal_path = checkpoint_path.with_suffix('.wal')
+        self._wal: Optional[TextIO] = None
+        self._wal_entries = 0
     
     def initialize(
         self,
@@ -56,33 +93,47 @@ class CheckpointManager:
         model: str,
         max_chars: int,
         provider: str,
-        total_chunks: int
+        total_chunks: int,
+        chunker_version: int
     ) -> bool:
         """
         Initialize or load checkpoint.
         
+        A checkpoint is only resumed when the input, run parameters and
+        chunker version all match; otherwise its chunk ids may name
+        different text and it is replaced.
+        
         Returns:
             True if resuming from existing checkpoint, False if starting fresh
         """
-        # Calculate input file hash
-        input_hash = calculate_file_hash(input_file)
         input_size = get_file_size(input_file)
+        input_mtime_ns = input_file.stat().st_mtime_ns
+        input_hash = None
         
         # Check for existing checkpoint
         if self.checkpoint_path.exists():
             try:
-                with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
-                    existing = CheckpointData.from_dict(json.load(f))
+                existing = CheckpointData.from_dict(_loads(self.checkpoint_path.read_bytes()))
+                
+                # Only re-hash the input if its size or mtime changed
+                if (existing.input_size == input_size and
+                    existing.input_mtime_ns == input_mtime_ns):
+                    input_hash = existing.input_hash
+                else:
+                    input_hash = calculate_file_hash(input_file)
                 
                 # Validate checkpoint matches current run
                 if (existing.input_hash == input_hash and
                     existing.mode == mode and
                     existing.model == model and
                     existing.max_chars == max_chars and
-                    existing.provider == provider):
+                    existing.provider == provider and
+                    existing.chunker_version == chunker_version):
                     
+                    existing.input_mtime_ns = input_mtime_ns
                     self._data = existing
                     self._chunks_done = set(existing.chunks_done)
+                    self._replay_wal()
                     log_message(f"Resuming from checkpoint: {len(self._chunks_done)}/{total_chunks} chunks done")
                     return True
                 else:
@@ -91,11 +142,14 @@ class CheckpointManager:
                 log_message(f"Could not load checkpoint: {e}. Starting fresh.")
         
         # Create new checkpoint
+        if input_hash is None:
+            input_hash = calculate_file_hash(input_file)
         now = datetime.now().isoformat()
         self._data = CheckpointData(
             input_file=str(input_file),
             input_hash=input_hash,
             input_size=input_size,
+            input_mtime_ns=input_mtime_ns,
             mode=mode,
             model=model,
             max_chars=max_chars,
@@ -103,7 +157,8 @@ class CheckpointManager:
             created_at=now,
             updated_at=now,
             chunks_done=[],
-            total_chunks=total_chunks
+            total_chunks=total_chunks,
+            chunker_version=chunker_version
         )
         self._chunks_done = set()
         
@@ -112,6 +167,7 @@ class CheckpointManager:
         ensure_dir(self.chunks_dir)
         
         self._save()
+        self._truncate_wal()
         return False
     
     def is_chunk_done(self, chunk_id: str) -> bool:
@@ -131,13 +187,17 @@ class CheckpointManager:
         with open(chunk_file, 'w', encoding='utf-8') as f:
             f.write(output_text)
         
-        # Update checkpoint
+        # Update checkpoint: append to WAL, snapshot periodically.
+        # chunks_done is the ordered record; _chunks_done is only a lookup index.
+        if chunk_id in self._chunks_done:
+            return
         self._chunks_done.add(chunk_id)
         if self._data:
-            self._data.chunks_done = list(self._chunks_done)
-            self._data.updated_at = datetime.now().isoformat()
+            self._data.chunks_done.append(chunk_id)
         
-        self._save()
+        self._append_wal(chunk_id)
+        if self._wal_entries >= WAL_COMPACT_EVERY:
+            self._compact()
     
     def get_chunk_output(self, chunk_id: str) -> Optional[str]:
         """Get saved output for a chunk."""
@@ -153,20 +213,81 @@ class CheckpointManager:
             return len(self._chunks_done), self._data.total_chunks
         return 0, 0
     
+    def flush(self):
+        """Durably write a checkpoint snapshot now and reset the WAL."""
+        if self._data:
+            self._compact()
+    
+    def close(self):
+        """Write a final checkpoint snapshot and close the WAL."""
+        self.flush()
+        if self._wal:
+            self._wal.close()
+            self._wal = None
+    
+    def _replay_wal(self):
+        """Merge chunk IDs recorded in the WAL since the last snapshot."""
+        if not self.wal_path.exists():
+            return
+        with open(self.wal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                chunk_id = line.strip()
+                if chunk_id and chunk_id not in self._chunks_done:
+                    self._chunks_done.add(chunk_id)
+                    if self._data:
+                        self._data.chunks_done.append(chunk_id)
+    
+    def _append_wal(self, chunk_id: str):
+        """Append a completed chunk ID to the WAL."""
+        if self._wal is None:
+            self._wal = open(self.wal_path, 'a', encoding='utf-8')
+        self._wal.write(chunk_id + '\n')
+        self._wal.flush()
+        self._wal_entries += 1
+    
+    def _truncate_wal(self):
+        """Discard WAL entries already covered by the JSON snapshot."""
+        if self._wal:
+            self._wal.close()
+            self._wal = None
+        if self.wal_path.exists():
+            self.wal_path.unlink()
+        self._wal_entries = 0
+    
+    def _compact(self):
+        """Fold the WAL into a fresh checkpoint.json snapshot."""
+        self._save()
+        self._truncate_wal()
+    
     def _save(self):
-        """Save checkpoint to file."""
+        """
+        Save checkpoint to file.
+        
+        Writes a temp file, fsyncs it and renames it over checkpoint.json, so
+        a crash mid-write never leaves a truncated snapshot behind (the WAL is
+        deleted right after, so the snapshot must be complete).
+        """
         if self._data:
-            with open(self.checkpoint_path, 'w', encoding='utf-8') as f:
-                json.dump(self._data.to_dict(), f, indent=2, ensure_ascii=False)
+            self._data.updated_at = datetime.now().isoformat()
+            tmp_path = self.checkpoint_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(_dumps(self._data.to_dict()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.checkpoint_path)
     
     def clear(self):
         """Clear checkpoint and all chunk files."""
         if self.checkpoint_path.exists():
             self.checkpoint_path.unlink()
+        self._truncate_wal()
         
         if self.chunks_dir.exists():
-            for chunk_file in self.chunks_dir.glob("*.md"):
-                chunk_file.unlink()
+            # scandir avoids a Path object and fnmatch per entry
+            with os.scandir(self.chunks_dir) as it:
+                for entry in it:
+                    if entry.name.endswith('.md') and entry.is_file():
+                        os.unlink(entry.path)
         
         self._data = None
         self._chunks_done = set()
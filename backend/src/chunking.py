@@ -1,13 +1,25 @@
 """Text chunking module for splitting long chapters into processable parts."""
 
+import re
 from dataclasses import dataclass
-from typing import List
+from typing import Iterable, Iterator, List
 
 from .chapter_split import Chapter
 from .utils import log_message
 
 
-@dataclass
+# Split by sentence-ending punctuation followed by whitespace
+# Keep the punctuation with the sentence
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?…。！？])\s+')
+
+# Bump whenever chunk boundaries change for the same input and max_chars,
+# so checkpoints from an older chunker start fresh instead of resuming
+# chunk ids that now cover different text.
+# 2: paragraph separators count toward max_chars
+CHUNKER_VERSION = 2
+
+
+@dataclass(slots=True)
 class Chunk:
     """Represents a chunk of text to be processed."""
     chapter_number: int
@@ -58,21 +70,22 @@ def split_by_paragraphs(text: str, max_chars: int) -> List[str]:
             sentences = split_by_sentences(para)
             for sentence in sentences:
                 sent_len = len(sentence)
-                if current_length + sent_len + 1 > max_chars and current_chunk:
+                if current_chunk and current_length + 2 + sent_len > max_chars:
                     chunks.append('\n\n'.join(current_chunk))
                     current_chunk = []
                     current_length = 0
+                # current_length tracks the exact joined length (+2 per \n\n separator)
+                current_length += sent_len + (2 if current_chunk else 0)
                 current_chunk.append(sentence)
-                current_length += sent_len + 2  # +2 for \n\n
         else:
             # Check if adding this paragraph exceeds limit
-            if current_length + para_len + 2 > max_chars and current_chunk:
+            if current_chunk and current_length + 2 + para_len > max_chars:
                 chunks.append('\n\n'.join(current_chunk))
                 current_chunk = []
                 current_length = 0
             
+            current_length += para_len + (2 if current_chunk else 0)
             current_chunk.append(para)
-            current_length += para_len + 2
     
     # Don't forget the last chunk
     if current_chunk:
@@ -83,26 +96,22 @@ def split_by_paragraphs(text: str, max_chars: int) -> List[str]:
 
 def split_by_sentences(text: str) -> List[str]:
     """Split text into sentences for fine-grained splitting."""
-    import re
-    
-    # Split by sentence-ending punctuation followed by space or newline
-    # Keep the punctuation with the sentence
-    pattern = r'(?<=[.!?…。！？])\s+'
-    sentences = re.split(pattern, text)
-    
-    return [s.strip() for s in sentences if s.strip()]
+    return [s for s in (p.strip() for p in _SENTENCE_SPLIT_RE.split(text)) if s]
 
 
-def create_chunks(chapters: List[Chapter], max_chars: int = 7000) -> List[Chunk]:
+def iter_chunks(chapters: Iterable[Chapter], max_chars: int = 7000) -> Iterator[Chunk]:
     """
-    Create processable chunks from chapters.
+    Lazily yield processable chunks from chapters.
+    
+    Only one chapter's parts are buffered at a time (needed for total_parts),
+    so chapters can be streamed straight from iter_chapters.
     
     Args:
-        chapters: List of Chapter objects
+        chapters: Iterable of Chapter objects
         max_chars: Maximum characters per chunk (default 7000, must be > 0)
         
-    Returns:
-        List of Chunk objects
+    Yields:
+        Chunk objects in chapter order
         
     Raises:
         ValueError: If max_chars is not positive
@@ -110,39 +119,58 @@ def create_chunks(chapters: List[Chapter], max_chars: int = 7000) -> List[Chunk]
     if max_chars <= 0:
         raise ValueError(f"max_chars must be positive, got {max_chars}")
     
-    log_message(f"Creating chunks with max_chars={max_chars}...")
-    
-    all_chunks: List[Chunk] = []
-    
     for chapter in chapters:
-        chapter_text = chapter.text.strip()
+        chapter_text = chapter.text  # Already stripped by split_into_chapters
         
         if len(chapter_text) <= max_chars:
             # Single chunk for this chapter
             chunk_id = f"chap_{chapter.number:04d}_part_001"
-            all_chunks.append(Chunk(
+            yield Chunk(
                 chapter_number=chapter.number,
                 chapter_title=chapter.title,
                 part_number=1,
                 total_parts=1,
                 text=chapter_text,
                 chunk_id=chunk_id
-            ))
+            )
         else:
             # Split into multiple chunks
             text_parts = split_by_paragraphs(chapter_text, max_chars)
             total_parts = len(text_parts)
+            id_prefix = f"chap_{chapter.number:04d}_part_"  # Only the part suffix varies
             
             for i, part_text in enumerate(text_parts, start=1):
-                chunk_id = f"chap_{chapter.number:04d}_part_{i:03d}"
-                all_chunks.append(Chunk(
+                chunk_id = f"{id_prefix}{i:03d}"
+                yield Chunk(
                     chapter_number=chapter.number,
                     chapter_title=chapter.title,
                     part_number=i,
                     total_parts=total_parts,
                     text=part_text,
                     chunk_id=chunk_id
-                ))
+                )
+
+
+def create_chunks(chapters: List[Chapter], max_chars: int = 7000) -> List[Chunk]:
+    """
+    Create processable chunks from chapters.
+    
+    Args:
+        chapters: List of Chapter objects
+        max_chars: Maximum characters per chunk (default 7000, must be > 0)
+        
+    Returns:
+        List of Chunk objects
+        
+    Raises:
+        ValueError: If max_chars is not positive
+    """
+    if max_chars <= 0:
+        raise ValueError(f"max_chars must be positive, got {max_chars}")
+    
+    log_message(f"Creating chunks with max_chars={max_chars}...")
+    
+    all_chunks = list(iter_chunks(chapters, max_chars))
     
     log_message(f"Created {len(all_chunks)} chunks from {len(chapters)} chapters")
     
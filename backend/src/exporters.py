@@ -1,31 +1,58 @@
 """Export modules for DOCX and Markdown output."""
 
+import copy
+import io
+from itertools import groupby
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Optional
 from docx import Document
 from docx.shared import Pt, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 
 from .chunking import Chunk
 from .utils import log_message, ensure_dir
 
 
+def _read_chunk_output(chunk_file: Path) -> Optional[str]:
+    """Read a single chunk output file, or None if it does not exist."""
+    try:
+        with open(chunk_file, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _load_chunk_output(chunk: Chunk, chunks_dir: Path, warn_missing: bool = True) -> str:
+    """Read one chunk's processed text, falling back to the original text."""
+    output_text = _read_chunk_output(chunks_dir / f"{chunk.chunk_id}.md")
+    if output_text is None:
+        if warn_missing:
+            log_message(f"Warning: Missing output for {chunk.chunk_id}")
+        return chunk.text
+    return output_text
+
+
 def export_to_markdown(
     chunks: List[Chunk],
-    chunk_outputs: Dict[str, str],
+    chunks_dir: Path,
     output_path: Path,
     title: str = "Polished Novel",
-    mode: str = "polish_vi"
+    mode: str = "polish_vi",
+    warn_missing: bool = True
 ) -> Path:
     """
     Export processed chunks to Markdown file.
     
     Args:
         chunks: List of original chunks (for metadata)
-        chunk_outputs: Dict mapping chunk_id to processed text
+        chunks_dir: Directory containing chunk output files (read lazily)
         output_path: Output file path
         title: Document title
         mode: Processing mode
+        warn_missing: Log a warning for each chunk without an output file
         
     Returns:
         Path to created file
@@ -34,56 +61,91 @@ def export_to_markdown(
     
     ensure_dir(output_path.parent)
     
-    lines = []
-    
-    # Title
     mode_label = "Biên tập" if mode == "polish_vi" else "Dịch"
-    lines.append(f"# {title}")
-    lines.append(f"*{mode_label} bởi AI*\n")
-    lines.append("---\n")
-    
-    current_chapter = -1
-    
-    for chunk in chunks:
-        # Add chapter heading if new chapter
-        if chunk.chapter_number != current_chapter:
-            current_chapter = chunk.chapter_number
-            lines.append(f"\n## Chương {chunk.chapter_number}: {chunk.chapter_title}\n")
+    lines_written = 0
+    
+    # Stream straight to disk; lines are newline-separated with no trailing newline
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        def write_line(line: str) -> None:
+            nonlocal lines_written
+            if lines_written:
+                f.write('\n')
+            f.write(line)
+            lines_written += 1
         
-        # Add part heading if multi-part
-        if chunk.total_parts > 1:
-            lines.append(f"\n### Phần {chunk.part_number}/{chunk.total_parts}\n")
+        # Title
+        write_line(f"# {title}")
+        write_line(f"*{mode_label} bởi AI*\n")
+        write_line("---\n")
         
-        # Add processed text
-        output_text = chunk_outputs.get(chunk.chunk_id, "")
-        if output_text:
-            lines.append(output_text)
-            lines.append("")
-    
-    # Write file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(lines))
-    
-    log_message(f"Markdown exported: {len(lines)} lines")
+        # One group per run of chunks from the same chapter
+        for chapter_number, group in groupby(chunks, key=attrgetter('chapter_number')):
+            group = list(group)
+            write_line(f"\n## Chương {chapter_number}: {group[0].chapter_title}\n")
+            
+            for chunk in group:
+                # Add part heading if multi-part
+                if chunk.total_parts > 1:
+                    write_line(f"\n### Phần {chunk.part_number}/{chunk.total_parts}\n")
+                
+                # Add processed text
+                output_text = _load_chunk_output(chunk, chunks_dir, warn_missing)
+                if output_text:
+                    write_line(output_text)
+                    write_line("")
+    
+    log_message(f"Markdown exported: {lines_written} lines")
     return output_path
 
 
+def _body_paragraph_template():
+    """Build the <w:pPr> shared by body paragraphs (0.5" first-line indent, 6pt after)."""
+    ppr = OxmlElement('w:pPr')
+    spacing = OxmlElement('w:spacing')
+    spacing.set(qn('w:after'), str(Pt(6).twips))
+    ppr.append(spacing)
+    ind = OxmlElement('w:ind')
+    ind.set(qn('w:firstLine'), str(Inches(0.5).twips))
+    ppr.append(ind)
+    return ppr
+
+
+def _make_body_paragraph(text: str, ppr_template):
+    """Build a <w:p> element directly, bypassing python-docx's per-paragraph proxies."""
+    p = OxmlElement('w:p')
+    p.append(copy.deepcopy(ppr_template))
+    r = OxmlElement('w:r')
+    # Tabs are <w:tab/> elements, as python-docx's run.text would emit them
+    for i, segment in enumerate(text.split('\t')):
+        if i:
+            r.append(OxmlElement('w:tab'))
+        if segment:
+            t = OxmlElement('w:t')
+            t.set(qn('xml:space'), 'preserve')  # Keep spaces next to tabs
+            t.text = segment
+            r.append(t)
+    p.append(r)
+    return p
+
+
 def export_to_docx(
     chunks: List[Chunk],
-    chunk_outputs: Dict[str, str],
+    chunks_dir: Path,
     output_path: Path,
     title: str = "Polished Novel",
-    mode: str = "polish_vi"
+    mode: str = "polish_vi",
+    warn_missing: bool = True
 ) -> Path:
     """
     Export processed chunks to DOCX file.
     
     Args:
         chunks: List of original chunks (for metadata)
-        chunk_outputs: Dict mapping chunk_id to processed text
+        chunks_dir: Directory containing chunk output files (read lazily)
         output_path: Output file path
         title: Document title
         mode: Processing mode
+        warn_missing: Log a warning for each chunk without an output file
         
     Returns:
         Path to created file
@@ -111,64 +173,44 @@ def export_to_docx(
     
     doc.add_paragraph()  # Spacing
     
-    current_chapter = -1
+    # Body paragraphs are inserted as raw XML before the trailing section properties
+    sect_pr = doc.element.body.find(qn('w:sectPr'))
+    ppr_template = _body_paragraph_template()
+    
+    # Resolve heading styles once instead of by name on every add_heading
+    chapter_style = doc.styles['Heading 1']
+    part_style = doc.styles['Heading 2']
     
-    for chunk in chunks:
-        # Add chapter heading if new chapter (Heading 2)
-        if chunk.chapter_number != current_chapter:
-            current_chapter = chunk.chapter_number
-            heading_text = f"Chương {chunk.chapter_number}: {chunk.chapter_title}"
-            doc.add_heading(heading_text, level=1)
+    # One group per run of chunks from the same chapter
+    for chapter_number, group in groupby(chunks, key=attrgetter('chapter_number')):
+        group = list(group)
         
-        # Add part heading if multi-part (Heading 3)
-        if chunk.total_parts > 1:
-            part_text = f"Phần {chunk.part_number}/{chunk.total_parts}"
-            doc.add_heading(part_text, level=2)
+        # Chapter heading (Heading 2)
+        heading_text = f"Chương {chapter_number}: {group[0].chapter_title}"
+        doc.add_paragraph(heading_text, chapter_style)
         
-        # Add processed text
-        output_text = chunk_outputs.get(chunk.chunk_id, "")
-        if output_text:
-            # Split by paragraphs and add each
-            paragraphs = output_text.split('\n\n')
-            for para_text in paragraphs:
-                para_text = para_text.strip()
-                if para_text:
-                    # Handle single newlines within paragraph
-                    para_text = para_text.replace('\n', ' ')
-                    para = doc.add_paragraph(para_text)
-                    para.paragraph_format.first_line_indent = Inches(0.5)
-                    para.paragraph_format.space_after = Pt(6)
-    
-    # Save document
-    doc.save(str(output_path))
+        for chunk in group:
+            # Add part heading if multi-part (Heading 3)
+            if chunk.total_parts > 1:
+                part_text = f"Phần {chunk.part_number}/{chunk.total_parts}"
+                doc.add_paragraph(part_text, part_style)
+            
+            # Add processed text
+            output_text = _load_chunk_output(chunk, chunks_dir, warn_missing)
+            if output_text:
+                # Split by paragraphs and add each
+                paragraphs = output_text.split('\n\n')
+                for para_text in paragraphs:
+                    para_text = para_text.strip()
+                    if para_text:
+                        # Handle single newlines within paragraph
+                        para_text = para_text.replace('\n', ' ')
+                        sect_pr.addprevious(_make_body_paragraph(para_text, ppr_template))
+    
+    # Save document to memory first so the zip is written in one call
+    buf = io.BytesIO()
+    doc.save(buf)
+    output_path.write_bytes(buf.getvalue())
     
     log_message(f"DOCX exported successfully")
     return output_path
-
-
-def collect_chunk_outputs(
-    chunks: List[Chunk],
-    chunks_dir: Path
-) -> Dict[str, str]:
-    """
-    Collect all chunk outputs from files.
-    
-    Args:
-        chunks: List of chunks
-        chunks_dir: Directory containing chunk output files
-        
-    Returns:
-        Dict mapping chunk_id to output text
-    """
-    outputs = {}
-    
-    for chunk in chunks:
-        chunk_file = chunks_dir / f"{chunk.chunk_id}.md"
-        if chunk_file.exists():
-            with open(chunk_file, 'r', encoding='utf-8') as f:
-                outputs[chunk.chunk_id] = f.read()
-        else:
-            log_message(f"Warning: Missing output for {chunk.chunk_id}")
-            outputs[chunk.chunk_id] = chunk.text  # Fallback to original
-    
-    return outputs
@@ -1,10 +1,17 @@
 """Gemini API client with support for both AI Studio and Vertex AI."""
 
+import asyncio
+import functools
+import json
 import os
+import random
+import re
+import threading
 import time
-from typing import Optional
+from typing import Dict, List, Optional
 from pathlib import Path
 
+from .llm_cache import LLMCache
 from .utils import log_message
 
 
@@ -13,6 +20,88 @@ class GeminiClientError(Exception):
     pass
 
 
+# Upper bound for a single backoff sleep (seconds)
+MAX_RETRY_WAIT = 60.0
+
+# Server-suggested delays: "Please retry in 23.5s" / "retry_delay { seconds: 23 }"
+_RETRY_IN_RE = re.compile(r'retry in (\d+(?:\.\d+)?)\s*s', re.IGNORECASE)
+_RETRY_DELAY_RE = re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE)
+
+
+def _server_retry_after(error: Exception) -> Optional[float]:
+    """Extract the server-requested retry delay from an API error, if any."""
+    retry_after = getattr(error, 'retry_after', None)
+    if isinstance(retry_after, (int, float)) and retry_after > 0:
+        return float(retry_after)
+    
+    error_text = str(error)
+    match = _RETRY_IN_RE.search(error_text) or _RETRY_DELAY_RE.search(error_text)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+_dotenv_loaded = False
+
+
+def _load_dotenv_once():
+    """Load .env into os.environ on first call only (no-op without python-dotenv)."""
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    _dotenv_loaded = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+class TokenBucket:
+    """
+    Async token bucket that caps request starts at `rate_per_min`.
+    
+    Requests go out immediately while tokens remain and only wait once the
+    bucket is empty, so slow responses don't waste quota the way a fixed
+    sleep after every call does. Create it inside the running event loop.
+    """
+    
+    def __init__(self, rate_per_min: float, capacity: float = 1.0):
+        """
+        Args:
+            rate_per_min: Sustained requests per minute
+            capacity: Burst size (tokens available at start)
+        """
+        if rate_per_min <= 0:
+            raise ValueError(f"rate_per_min must be positive, got {rate_per_min}")
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _cancel_batch(job):
+    """Best-effort cancel of an unfinished batch job."""
+    try:
+        job.cancel()
+        log_message(f"Cancelled batch job {job.resource_name}")
+    except Exception as e:
+        log_message(f"Warning: Could not cancel batch job {job.resource_name}: {e}")
+
+
 class GeminiClient:
     """
     Unified Gemini client supporting both AI Studio and Vertex AI.
@@ -28,6 +117,7 @@ class GeminiClient:
         auth_file: Optional[str] = None,
         temperature: float = 0.2,
         max_output_tokens: int = 8192,
+        cache: Optional[LLMCache] = None,
     ):
         """
         Initialize Gemini client.
@@ -41,6 +131,7 @@ class GeminiClient:
             auth_file: Path to service account JSON for Vertex AI
             temperature: Generation temperature
             max_output_tokens: Maximum output tokens
+            cache: Optional response cache consulted before each API call
         """
         self.provider = provider
         self.model_name = model_name
@@ -49,6 +140,11 @@ class GeminiClient:
         
         self._model = None
         self._system_instruction = None
+        self._cache = cache
+        
+        # Shared rate-limit pause so concurrent calls back off together
+        self._pause_lock = threading.Lock()
+        self._pause_until = 0.0
         
         if provider == "studio":
             self._init_studio(api_key)
@@ -67,12 +163,8 @@ class GeminiClient:
         
         if not api_key:
             # Try loading from .env file
-            try:
-                from dotenv import load_dotenv
-                load_dotenv()
-                api_key = os.environ.get("GEMINI_API_KEY")
-            except ImportError:
-                pass
+            _load_dotenv_once()
+            api_key = os.environ.get("GEMINI_API_KEY")
         
         if not api_key:
             raise GeminiClientError(
@@ -80,7 +172,9 @@ class GeminiClient:
                 "or pass --api-key argument."
             )
         
-        genai.configure(api_key=api_key)
+        # Pin the gRPC transport: the SDK keeps one process-wide client whose
+        # HTTP/2 channel is reused (and multiplexed) across generate() calls
+        genai.configure(api_key=api_key, transport="grpc")
         log_message(f"Initialized AI Studio client with model: {self.model_name}")
         
         self._genai = genai
@@ -147,7 +241,7 @@ class GeminiClient:
         Args:
             prompt: User prompt
             max_retries: Maximum retry attempts
-            retry_delay: Initial delay between retries (exponential backoff)
+            retry_delay: Minimum delay between retries (decorrelated jitter backoff)
             
         Returns:
             Generated text
@@ -155,39 +249,238 @@ class GeminiClient:
         if self._model is None:
             raise GeminiClientError("System instruction not set. Call set_system_instruction first.")
         
+        cached = self.cached_response(prompt)
+        if cached is not None:
+            return cached
+        
         last_error = None
+        prev_wait = retry_delay
         
         for attempt in range(max_retries):
+            self._wait_for_pause()
             try:
                 response = self._model.generate_content(prompt)
                 
                 # Extract text from response
                 if hasattr(response, 'text'):
-                    return response.text
+                    text = response.text
                 elif hasattr(response, 'candidates') and response.candidates:
-                    return response.candidates[0].content.parts[0].text
+                    text = response.candidates[0].content.parts[0].text
                 else:
                     raise GeminiClientError("Unexpected response format")
+                
+                self.cache_response(prompt, text)
+                return text
                     
             except Exception as e:
                 last_error = e
                 error_msg = str(e).lower()
                 
-                # Check for rate limiting
-                if 'rate' in error_msg or 'quota' in error_msg or '429' in error_msg:
-                    wait_time = retry_delay * (2 ** attempt)
-                    log_message(f"Rate limited. Waiting {wait_time:.1f}s before retry...")
-                    time.sleep(wait_time)
-                    continue
+                is_rate_limited = 'rate' in error_msg or 'quota' in error_msg or '429' in error_msg
+                is_transient = 'timeout' in error_msg or '503' in error_msg or '500' in error_msg
+                
+                if not (is_rate_limited or is_transient):
+                    # Non-retryable error
+                    raise GeminiClientError(f"API error: {e}")
                 
-                # Check for transient errors
-                if 'timeout' in error_msg or '503' in error_msg or '500' in error_msg:
-                    wait_time = retry_delay * (2 ** attempt)
+                # Prefer the server's own delay; otherwise decorrelated jitter
+                wait_time = _server_retry_after(e)
+                if wait_time is None:
+                    wait_time = random.uniform(retry_delay, min(MAX_RETRY_WAIT, prev_wait * 3))
+                prev_wait = wait_time
+                
+                if is_rate_limited:
+                    log_message(f"Rate limited. Waiting {wait_time:.1f}s before retry...")
+                    # Hold back every in-flight caller, not just this one
+                    self._pause_for(wait_time)
+                else:
                     log_message(f"Transient error. Waiting {wait_time:.1f}s before retry...")
                     time.sleep(wait_time)
-                    continue
-                
-                # Non-retryable error
-                raise GeminiClientError(f"API error: {e}")
         
         raise GeminiClientError(f"Max retries exceeded. Last error: {last_error}")
+    
+    def _cache_key(self, prompt: str) -> str:
+        """Cache key covering everything that shapes the response to prompt."""
+        return LLMCache.make_key(
+            self.model_name, self.temperature, self.max_output_tokens,
+            self._system_instruction, prompt
+        )
+    
+    def cached_response(self, prompt: str) -> Optional[str]:
+        """Return the cached response for prompt, or None (also when caching is off)."""
+        if self._cache is None:
+            return None
+        return self._cache.get(self._cache_key(prompt))
+    
+    def cache_response(self, prompt: str, text: str):
+        """Store a response obtained outside generate() (e.g. from a batch job)."""
+        if self._cache is not None:
+            self._cache.put(self._cache_key(prompt), text)
+    
+    def warm_up(self):
+        """
+        Open the API connection and fetch auth ahead of the first real call.
+        
+        Uses count_tokens, which goes through the same service as
+        generate_content but is free and doesn't count against quota.
+        Failures are ignored; the first generate() will surface them.
+        """
+        if self._model is None:
+            return
+        try:
+            self._model.count_tokens(".")
+        except Exception:
+            pass
+    
+    def _pause_for(self, seconds: float):
+        """Pause all callers of this client for at least `seconds`."""
+        with self._pause_lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+    
+    def _wait_for_pause(self):
+        """Sleep until any shared rate-limit pause has elapsed."""
+        while True:
+            with self._pause_lock:
+                remaining = self._pause_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+    
+    async def generate_async(
+        self,
+        prompt: str,
+        max_retries: int = 3,
+        retry_delay: float = 2.0
+    ) -> str:
+        """
+        Async variant of generate().
+        
+        Runs the blocking SDK call in the event loop's default thread pool so
+        several requests can be in flight at once.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(self.generate, prompt, max_retries, retry_delay)
+        )
+    
+    def _batch_request(self, prompt: str) -> dict:
+        """Build one Vertex AI batch prediction request body for a prompt."""
+        request = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": self.temperature,
+                "maxOutputTokens": self.max_output_tokens,
+            },
+        }
+        if self._system_instruction:
+            request["systemInstruction"] = {"parts": [{"text": self._system_instruction}]}
+        return request
+    
+    def submit_batch(self, prompts: List[str], gcs_prefix: str):
+        """
+        Submit prompts as a single Vertex AI batch prediction job.
+        
+        Args:
+            prompts: User prompts, one request each
+            gcs_prefix: gs://bucket/path under which input and output are stored
+            
+        Returns:
+            The submitted BatchPredictionJob
+        """
+        if self.provider != "vertex":
+            raise GeminiClientError("Batch mode requires the vertex provider")
+        if not gcs_prefix.startswith("gs://"):
+            raise GeminiClientError(f"Batch GCS prefix must start with gs://, got: {gcs_prefix}")
+        
+        from google.cloud import storage
+        from vertexai.batch_prediction import BatchPredictionJob
+        
+        gcs_prefix = gcs_prefix.rstrip("/")
+        bucket_name, _, path = gcs_prefix[len("gs://"):].partition("/")
+        input_path = f"{path}/input.jsonl" if path else "input.jsonl"
+        
+        lines = [
+            json.dumps({"request": self._batch_request(prompt)}, ensure_ascii=False)
+            for prompt in prompts
+        ]
+        try:
+            blob = storage.Client().bucket(bucket_name).blob(input_path)
+            blob.upload_from_string("\n".join(lines), content_type="application/jsonl")
+            
+            job = BatchPredictionJob.submit(
+                source_model=self.model_name,
+                input_dataset=f"gs://{bucket_name}/{input_path}",
+                output_uri_prefix=f"{gcs_prefix}/output",
+            )
+        except Exception as e:
+            raise GeminiClientError(f"Batch submission failed: {e}")
+        
+        log_message(f"Submitted batch job {job.resource_name} with {len(prompts)} requests")
+        return job
+    
+    def wait_batch(
+        self,
+        job,
+        poll_interval: float = 30.0,
+        max_poll_interval: float = 300.0,
+        timeout: float = 24 * 3600.0
+    ) -> Dict[str, str]:
+        """
+        Wait for a batch job to finish and download its results.
+        
+        Args:
+            job: BatchPredictionJob returned by submit_batch
+            poll_interval: Initial delay between status checks (grows to max_poll_interval)
+            max_poll_interval: Longest delay between status checks
+            timeout: Seconds to wait before giving up (0 = no limit)
+            
+        Returns:
+            Dict mapping each prompt to its generated text (failed requests omitted)
+            
+        Raises:
+            GeminiClientError: If the job fails or doesn't finish within timeout.
+                On timeout or interrupt the job is cancelled so it stops billing.
+        """
+        from google.cloud import storage
+        
+        deadline = time.monotonic() + timeout if timeout > 0 else None
+        try:
+            while not job.has_ended:
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise GeminiClientError(
+                            f"Batch job {job.resource_name} did not finish within {timeout / 3600:.1f}h"
+                        )
+                    time.sleep(min(poll_interval, remaining))
+                else:
+                    time.sleep(poll_interval)
+                poll_interval = min(poll_interval * 1.5, max_poll_interval)
+                job.refresh()
+                log_message(f"Batch job state: {job.state.name}")
+        except (GeminiClientError, KeyboardInterrupt):
+            _cancel_batch(job)
+            raise
+        
+        if not job.has_succeeded:
+            raise GeminiClientError(f"Batch job failed: {job.error}")
+        
+        bucket_name, _, path = job.output_location[len("gs://"):].partition("/")
+        results: Dict[str, str] = {}
+        for blob in storage.Client().list_blobs(bucket_name, prefix=path):
+            if not blob.name.endswith(".jsonl"):
+                continue
+            for line in blob.download_as_text().splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                try:
+                    prompt = record["request"]["contents"][0]["parts"][0]["text"]
+                    parts = record["response"]["candidates"][0]["content"]["parts"]
+                except (KeyError, IndexError):
+                    # Failed requests carry a status instead of a response
+                    continue
+                results[prompt] = "".join(part.get("text", "") for part in parts)
+        
+        return results
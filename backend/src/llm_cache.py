@@ -0,0 +1,71 @@
+"""Persistent prompt/response cache for repeat runs over the same text."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .utils import ensure_dir
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of model responses keyed by a hash of the request.
+    
+    The cache survives style changes and resumed runs, so unchanged chunks
+    are never re-billed; --overwrite clears it so a forced fresh run really
+    asks the model again. Safe to share between the worker threads used by
+    generate_async.
+    """
+    
+    def __init__(self, db_path: Path):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            db_path: Path to the SQLite file (e.g. outdir/llm_cache.sqlite)
+        """
+        ensure_dir(db_path.parent)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Build a cache key from everything that determines the response."""
+        return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def put(self, key: str, response: str):
+        """Store a response under key."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._conn.commit()
+    
+    def clear(self):
+        """Delete every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
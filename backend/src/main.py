@@ -1,11 +1,14 @@
 """Main CLI entry point for Novel Polisher backend."""
 
 import argparse
+import asyncio
 import io
+import multiprocessing
 import sys
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 # ============================================
 # CRITICAL: Force UTF-8 encoding on Windows
@@ -28,25 +31,27 @@ if sys.platform == 'win32':
     )
 
 try:
-    from src.pdf_extract import extract_text_from_pdf, PDFExtractionError, ScanBasedPDFError
+    from src.pdf_extract import extract_text_from_pdf, clear_extraction_cache, PDFExtractionError, ScanBasedPDFError
     from src.preprocess import preprocess_text
     from src.chapter_split import split_into_chapters, validate_chapters
-    from src.chunking import create_chunks
-    from src.prompts import get_system_prompt, build_user_prompt, load_style_file, load_glossary_file
-    from src.gemini_client import GeminiClient, GeminiClientError
+    from src.chunking import CHUNKER_VERSION, Chunk, create_chunks
+    from src.prompts import get_system_prompt, build_user_prompt, build_user_prompt_prefix, load_style_file, load_glossary_file
+    from src.gemini_client import GeminiClient, GeminiClientError, TokenBucket
     from src.checkpoint import CheckpointManager
-    from src.exporters import export_to_docx, export_to_markdown, collect_chunk_outputs
+    from src.llm_cache import LLMCache
+    from src.exporters import export_to_docx, export_to_markdown
     from src.utils import log_status, log_progress, log_message, log_done, log_error, ensure_dir
 except ImportError:
     # Fallback for when running as script/PyInstaller without src package
-    from pdf_extract import extract_text_from_pdf, PDFExtractionError, ScanBasedPDFError
+    from pdf_extract import extract_text_from_pdf, clear_extraction_cache, PDFExtractionError, ScanBasedPDFError
     from preprocess import preprocess_text
     from chapter_split import split_into_chapters, validate_chapters
-    from chunking import create_chunks
-    from prompts import get_system_prompt, build_user_prompt, load_style_file, load_glossary_file
-    from gemini_client import GeminiClient, GeminiClientError
+    from chunking import CHUNKER_VERSION, Chunk, create_chunks
+    from prompts import get_system_prompt, build_user_prompt, build_user_prompt_prefix, load_style_file, load_glossary_file
+    from gemini_client import GeminiClient, GeminiClientError, TokenBucket
     from checkpoint import CheckpointManager
-    from exporters import export_to_docx, export_to_markdown, collect_chunk_outputs
+    from llm_cache import LLMCache
+    from exporters import export_to_docx, export_to_markdown
     from utils import log_status, log_progress, log_message, log_done, log_error, ensure_dir
 
 
@@ -79,15 +84,27 @@ def parse_args():
     # Model options
     parser.add_argument("--model", default="gemini-1.5-pro", help="Model name")
     
-    # Page range
+    # Page range and extraction
     parser.add_argument("--start-page", type=int, default=1, help="Start page (default: 1)")
     parser.add_argument("--end-page", type=int, default=0, help="End page (0 = to end)")
+    parser.add_argument("--pdf-engine", choices=["pypdf", "pymupdf"], default="pypdf",
+                       help="PDF text extractor (default: pypdf; pymupdf is faster but AGPL "
+                            "and must be installed separately)")
     
     # Processing options
     parser.add_argument("--max-chars", type=int, default=7000,
                        help="Max characters per chunk (default: 7000)")
     parser.add_argument("--sleep-ms", type=int, default=250,
-                       help="Sleep between API calls in ms (default: 250)")
+                       help="Average gap between API calls in ms, used when --rpm is not given (default: 250)")
+    parser.add_argument("--rpm", type=float,
+                       help="Max API requests per minute (default: 60000 / --sleep-ms; 0 = unlimited)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                       help="Max concurrent API requests (default: 4)")
+    parser.add_argument("--batch", action="store_true",
+                       help="Submit all chunks as one Vertex AI batch job (cheaper, not interactive)")
+    parser.add_argument("--batch-gcs", help="gs://bucket/prefix for batch input/output (required with --batch)")
+    parser.add_argument("--batch-timeout", type=float, default=24,
+                       help="Hours to wait for the batch job before cancelling it (default: 24; 0 = no limit)")
     
     # Style and glossary
     parser.add_argument("--style", help="Path to style.yaml file")
@@ -96,7 +113,10 @@ def parse_args():
     # Checkpoint
     parser.add_argument("--checkpoint", help="Path to checkpoint.json (default: outdir/checkpoint.json)")
     parser.add_argument("--overwrite", action="store_true",
-                       help="Clear checkpoint and start fresh")
+                       help="Clear checkpoint and caches and start fresh")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Do not reuse or store extracted text (outdir/pdf_cache) or "
+                            "responses (outdir/llm_cache.sqlite)")
     
     return parser.parse_args()
 
@@ -128,6 +148,131 @@ def find_default_style_glossary(input_path: Path) -> tuple:
     return style_path, glossary_path
 
 
+async def process_chunks_async(
+    chunks: List[Chunk],
+    client: GeminiClient,
+    checkpoint: CheckpointManager,
+    prompt_prefix: str,
+    concurrency: int,
+    rpm: float,
+    processed_count: int,
+    total_chunks: int
+) -> None:
+    """
+    Send chunks to the API with up to `concurrency` requests in flight.
+    
+    Results are checkpointed and reported in chunk order: a response that
+    arrives early waits in a reorder buffer until every earlier chunk is
+    done, so progress stays monotonic. If processing stops on an error, the
+    buffered results are still saved. Request starts are capped at `rpm`
+    per minute (0 = unlimited).
+    
+    Raises:
+        GeminiClientError: On the first chunk that fails (already logged)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    bucket = TokenBucket(rpm, capacity=concurrency) if rpm > 0 else None
+    
+    # Every in-flight request holds a thread in generate_async; the loop's
+    # default pool (min(32, cpu + 4) threads) would cap concurrency below the flag
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    asyncio.get_running_loop().set_default_executor(executor)
+    
+    async def process_one(index: int, chunk: Chunk):
+        async with semaphore:
+            user_prompt = build_user_prompt(chunk, prompt_prefix)
+            log_message(f"Processing: Chapter {chunk.chapter_number}, Part {chunk.part_number}/{chunk.total_parts}")
+            
+            if bucket is not None:
+                await bucket.acquire()
+            try:
+                output_text = await client.generate_async(user_prompt)
+            except GeminiClientError as e:
+                log_error(2, f"API error on chunk {chunk.chunk_id}: {e}")
+                raise
+            return index, output_text
+    
+    tasks = [asyncio.create_task(process_one(i, chunk)) for i, chunk in enumerate(chunks)]
+    completed: Dict[int, str] = {}
+    next_to_emit = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, output_text = await next_done
+            completed[index] = output_text
+            
+            # Save results in order, up to the first chunk still in flight
+            while next_to_emit in completed:
+                chunk = chunks[next_to_emit]
+                checkpoint.mark_chunk_done(chunk.chunk_id, completed.pop(next_to_emit))
+                next_to_emit += 1
+                processed_count += 1
+                
+                percent = int((processed_count / total_chunks) * 100)
+                log_progress(percent, chunk.chapter_number, f"{chunk.part_number}/{chunk.total_parts}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Don't throw away finished work if an earlier chunk failed
+        for index in sorted(completed):
+            checkpoint.mark_chunk_done(chunks[index].chunk_id, completed[index])
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def process_chunks_batch(
+    chunks: List[Chunk],
+    client: GeminiClient,
+    checkpoint: CheckpointManager,
+    prompt_prefix: str,
+    gcs_prefix: str,
+    processed_count: int,
+    total_chunks: int,
+    timeout: float = 24 * 3600.0
+) -> None:
+    """
+    Process chunks through a single Vertex AI batch prediction job.
+    
+    Prompts already in the response cache are not resubmitted, and new
+    results are cached, so a re-run after a partial failure only sends the
+    chunks that still lack a result. Results are checkpointed in chunk
+    order; chunks without a result are left pending for a later run.
+    
+    Raises:
+        GeminiClientError: If the job fails, times out or some chunks got no result
+    """
+    prompts = [build_user_prompt(chunk, prompt_prefix) for chunk in chunks]
+    results: Dict[str, str] = {}
+    for prompt in prompts:
+        cached = client.cached_response(prompt)
+        if cached is not None:
+            results[prompt] = cached
+    
+    to_submit = [prompt for prompt in prompts if prompt not in results]
+    if results:
+        log_message(f"{len(results)} chunks served from response cache")
+    if to_submit:
+        job = client.submit_batch(to_submit, gcs_prefix)
+        batch_results = client.wait_batch(job, timeout=timeout)
+        for prompt, output_text in batch_results.items():
+            client.cache_response(prompt, output_text)
+        results.update(batch_results)
+    
+    missing = []
+    for chunk, prompt in zip(chunks, prompts):
+        output_text = results.get(prompt)
+        if output_text is None:
+            missing.append(chunk.chunk_id)
+            continue
+        
+        checkpoint.mark_chunk_done(chunk.chunk_id, output_text)
+        processed_count += 1
+        
+        percent = int((processed_count / total_chunks) * 100)
+        log_progress(percent, chunk.chapter_number, f"{chunk.part_number}/{chunk.total_parts}")
+    
+    if missing:
+        raise GeminiClientError(f"Batch job returned no result for {len(missing)} chunks (first: {missing[0]})")
+
+
 def main():
     """Main entry point."""
     args = parse_args()
@@ -138,6 +283,23 @@ def main():
         log_error(1, f"Input file not found: {input_path}")
         sys.exit(1)
     
+    if args.batch and (args.provider != "vertex" or not args.batch_gcs):
+        log_error(1, "--batch requires --provider vertex and --batch-gcs gs://bucket/prefix")
+        sys.exit(1)
+    
+    if args.batch_timeout < 0:
+        log_error(1, "--batch-timeout must be 0 (no limit) or a positive number of hours")
+        sys.exit(1)
+    
+    if args.rpm is not None and args.rpm < 0:
+        log_error(1, "--rpm must be 0 (unlimited) or a positive rate")
+        sys.exit(1)
+    
+    if args.rpm is None:
+        # Keep the --sleep-ms pacing (float: 90000 ms is 0.67 rpm, not 0 = unlimited);
+        # --sleep-ms 0 never waited, so it stays unthrottled
+        args.rpm = 60000 / args.sleep_ms if args.sleep_ms > 0 else 0
+    
     # Setup output directory
     outdir = Path(args.outdir).resolve()
     ensure_dir(outdir)
@@ -163,17 +325,51 @@ def main():
     log_status("START", input=str(input_path), outdir=str(outdir))
     
     try:
+        # Initialize Gemini client up front so its connection and auth
+        # warm up in the background while the PDF is extracted
+        llm_cache = None
+        if not args.no_cache:
+            llm_cache = LLMCache(outdir / "llm_cache.sqlite")
+            if args.overwrite:
+                # A forced fresh run must not be answered from earlier responses
+                llm_cache.clear()
+        
+        log_message(f"Initializing {args.provider.upper()} client...")
+        client = GeminiClient(
+            provider=args.provider,
+            model_name=args.model,
+            api_key=args.api_key,
+            project_id=args.project_id,
+            location=args.location,
+            auth_file=args.auth_file,
+            temperature=0.2,
+            max_output_tokens=8192,
+            cache=llm_cache
+        )
+        
+        # Set system prompt
+        system_prompt = get_system_prompt(args.mode)
+        client.set_system_instruction(system_prompt)
+        threading.Thread(target=client.warm_up, daemon=True).start()
+        
         # Step 1: Extract PDF text
+        pdf_cache_dir = None if args.no_cache else outdir / "pdf_cache"
+        if pdf_cache_dir and args.overwrite:
+            clear_extraction_cache(pdf_cache_dir)
+        
         log_message("Extracting text from PDF...")
-        full_text, page_texts = extract_text_from_pdf(
+        page_texts = extract_text_from_pdf(
             input_path,
             start_page=args.start_page,
-            end_page=args.end_page
+            end_page=args.end_page,
+            cache_dir=pdf_cache_dir,
+            engine=args.pdf_engine
         )
         
         # Step 2: Preprocess text
         log_message("Preprocessing text...")
-        clean_text = preprocess_text(full_text, page_texts)
+        clean_text = preprocess_text("\n\n".join(page_texts), page_texts)
+        del page_texts  # Raw text isn't needed again; free it before the API phase
         
         # Step 3: Split into chapters
         log_message("Splitting into chapters...")
@@ -201,93 +397,79 @@ def main():
             model=args.model,
             max_chars=args.max_chars,
             provider=args.provider,
-            total_chunks=total_chunks
+            total_chunks=total_chunks,
+            chunker_version=CHUNKER_VERSION
         )
         
-        # Step 6: Initialize Gemini client
-        log_message(f"Initializing {args.provider.upper()} client...")
-        client = GeminiClient(
-            provider=args.provider,
-            model_name=args.model,
-            api_key=args.api_key,
-            project_id=args.project_id,
-            location=args.location,
-            auth_file=args.auth_file,
-            temperature=0.2,
-            max_output_tokens=8192
+        # Load style and glossary content once; every prompt shares this block
+        prompt_prefix = build_user_prompt_prefix(
+            load_style_file(style_path),
+            load_glossary_file(glossary_path)
         )
         
-        # Set system prompt
-        system_prompt = get_system_prompt(args.mode)
-        client.set_system_instruction(system_prompt)
-        
-        # Load style and glossary content
-        style_content = load_style_file(style_path)
-        glossary_content = load_glossary_file(glossary_path)
-        
         # Step 7: Process chunks
         log_message("Processing chunks with AI...")
-        sleep_seconds = args.sleep_ms / 1000.0
         
         processed_count = 0
-        for i, chunk in enumerate(chunks):
+        pending = []
+        for chunk in chunks:
             # Check if already done
             if checkpoint.is_chunk_done(chunk.chunk_id):
                 processed_count += 1
                 percent = int((processed_count / total_chunks) * 100)
                 log_progress(percent, chunk.chapter_number, f"{chunk.part_number}/{chunk.total_parts}")
-                continue
-            
-            # Build prompt
-            user_prompt = build_user_prompt(chunk, style_content, glossary_content)
-            
-            # Call API
-            log_message(f"Processing: Chapter {chunk.chapter_number}, Part {chunk.part_number}/{chunk.total_parts}")
-            
+            else:
+                pending.append(chunk)
+        
+        if pending and args.batch:
             try:
-                output_text = client.generate(user_prompt)
-                
-                # Save result
-                checkpoint.mark_chunk_done(chunk.chunk_id, output_text)
-                processed_count += 1
-                
-                percent = int((processed_count / total_chunks) * 100)
-                log_progress(percent, chunk.chapter_number, f"{chunk.part_number}/{chunk.total_parts}")
-                
-                # Sleep between requests
-                if i < len(chunks) - 1:
-                    time.sleep(sleep_seconds)
-                    
+                process_chunks_batch(
+                    pending,
+                    client,
+                    checkpoint,
+                    prompt_prefix,
+                    gcs_prefix=args.batch_gcs,
+                    processed_count=processed_count,
+                    total_chunks=total_chunks,
+                    timeout=args.batch_timeout * 3600
+                )
             except GeminiClientError as e:
-                log_error(2, f"API error on chunk {chunk.chunk_id}: {e}")
+                log_error(2, f"Batch error: {e}")
+                sys.exit(2)
+        elif pending:
+            try:
+                asyncio.run(process_chunks_async(
+                    pending,
+                    client,
+                    checkpoint,
+                    prompt_prefix,
+                    concurrency=args.concurrency,
+                    rpm=args.rpm,
+                    processed_count=processed_count,
+                    total_chunks=total_chunks
+                ))
+            except GeminiClientError:
+                # Already reported with the failing chunk ID
                 sys.exit(2)
         
+        # Fold the checkpoint WAL into a final snapshot
+        checkpoint.close()
+        
         # Step 8: Export results
         log_message("Exporting results...")
         
         # Get input filename for title
         title = input_path.stem
         
-        # Collect all chunk outputs
-        chunk_outputs = collect_chunk_outputs(chunks, chunks_dir)
-        
-        docx_path = None
-        md_path = None
-        
-        # Export DOCX (default)
-        if args.export in ["docx", "all"]:
-            docx_path = outdir / "polished.docx"
-            export_to_docx(chunks, chunk_outputs, docx_path, title=title, mode=args.mode)
-        
-        # Export Markdown
-        if args.export in ["md", "all"]:
-            md_path = outdir / "polished.md"
-            export_to_markdown(chunks, chunk_outputs, md_path, title=title, mode=args.mode)
+        docx_path = outdir / "polished.docx" if args.export in ["docx", "all"] else None
+        # Markdown is always written (as a backup when only DOCX was requested)
+        md_path = outdir / "polished.md"
         
-        # Always create backup MD even if not explicitly requested
-        if args.export == "docx":
-            md_path = outdir / "polished.md"
-            export_to_markdown(chunks, chunk_outputs, md_path, title=title, mode=args.mode)
+        export_to_markdown(chunks, chunks_dir, md_path, title=title, mode=args.mode)
+        if docx_path:
+            # Missing chunks were already reported by the Markdown export
+            export_to_docx(chunks, chunks_dir, docx_path, title=title, mode=args.mode,
+                           warn_missing=False)
         
         # Final output
         output_file = docx_path if docx_path else md_path
@@ -315,4 +497,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Needed for PDF extraction worker processes in the frozen Windows build
+    multiprocessing.freeze_support()
     main()
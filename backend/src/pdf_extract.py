@@ -1,10 +1,40 @@
-"""PDF text extraction module using pypdf."""
+"""PDF text extraction module using pypdf (or PyMuPDF when explicitly chosen)."""
 
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
 from pathlib import Path
-from typing import List, Tuple
-from pypdf import PdfReader
+from typing import Iterator, List, Optional, Tuple
 
-from .utils import log_message
+# msgpack / orjson are optional speedups for the extraction cache
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .utils import ensure_dir, log_message
+
+
+# Below this many pages, worker start-up costs more than it saves
+PARALLEL_MIN_PAGES = 64
+
+# A PDF is treated as scan-based when more than this share of pages is empty
+SCAN_EMPTY_RATIO = 0.5
+
+# Extraction engine -> distribution name. pypdf is the default and the only
+# one in requirements.txt; PyMuPDF (AGPL, never bundled) is opt-in.
+PDF_ENGINES = {"pypdf": "pypdf", "pymupdf": "PyMuPDF"}
+
+# Extraction cache files are named pages-<hash>.<ext>; only these are ever deleted
+_CACHE_PREFIX = "pages-"
 
 
 class PDFExtractionError(Exception):
@@ -20,8 +50,10 @@ class ScanBasedPDFError(Exception):
 def extract_text_from_pdf(
     pdf_path: Path,
     start_page: int = 1,
-    end_page: int = 0
-) -> Tuple[str, List[str]]:
+    end_page: int = 0,
+    cache_dir: Optional[Path] = None,
+    engine: str = "pypdf"
+) -> List[str]:
     """
     Extract text from a PDF file.
     
@@ -29,16 +61,36 @@ def extract_text_from_pdf(
         pdf_path: Path to PDF file
         start_page: First page to extract (1-indexed)
         end_page: Last page to extract (0 = to end)
+        cache_dir: Directory for the extraction cache, e.g. outdir/pdf_cache
+            (None = disabled). It holds only the most recent extraction.
+        engine: "pypdf" or "pymupdf" (PyMuPDF must be installed separately)
         
     Returns:
-        Tuple of (full_text, list_of_page_texts)
+        List of stripped page texts; callers join with "\n\n" when they
+        need the full text, so only one copy is ever built
         
     Raises:
-        PDFExtractionError: If PDF cannot be read
-        ScanBasedPDFError: If >50% of pages have no extractable text
+        PDFExtractionError: If PDF cannot be read or the engine is unavailable
+        ScanBasedPDFError: If >50% of pages have no extractable text (raised
+            as soon as enough empty pages are seen to make that certain)
     """
     if not pdf_path.exists():
         raise PDFExtractionError(f"File not found: {pdf_path}")
+    if engine not in PDF_ENGINES:
+        raise PDFExtractionError(f"Unknown PDF engine: {engine}")
+    if _engine_version(engine) is None:
+        raise PDFExtractionError("--pdf-engine pymupdf requires PyMuPDF (pip install PyMuPDF)")
+    
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = cache_dir / _cache_name(pdf_path, start_page, end_page, engine)
+        cached = _load_cached_pages(cache_path)
+        if cached is not None:
+            log_message(f"Loaded {len(cached)} pages from extraction cache")
+            return cached
+    
+    # Imported here so the CLI starts fast and cache hits never load pypdf
+    from pypdf import PdfReader
     
     try:
         reader = PdfReader(str(pdf_path))
@@ -58,26 +110,23 @@ def extract_text_from_pdf(
     
     log_message(f"Extracting pages {start_page} to {end_page}")
     
+    total_to_extract = end_page - (start_page - 1)
     page_texts: List[str] = []
     empty_pages = 0
     
-    total_to_extract = end_page - (start_page - 1)
-    for i, page_num in enumerate(range(start_page - 1, end_page)):
-        try:
-            page = reader.pages[page_num]
-            text = page.extract_text() or ""
-            text = text.strip()
-            
-            if len(text) < 10:  # Almost empty
-                empty_pages += 1
-                
-            page_texts.append(text)
-        except Exception as e:
+    for i, (text, error) in enumerate(_iter_page_results(pdf_path, start_page - 1, end_page, engine)):
+        if error is not None:
             # Only log first few errors to avoid spam
             if empty_pages < 5:
-                log_message(f"Warning: Could not extract page {page_num + 1}: {e}")
-            page_texts.append("")
+                log_message(f"Warning: Could not extract page {start_page + i}: {error}")
             empty_pages += 1
+        elif len(text) < 10:  # Almost empty
+            empty_pages += 1
+        page_texts.append(text)
+        
+        # Stop early only once the final check can no longer pass
+        if empty_pages > total_to_extract * SCAN_EMPTY_RATIO:
+            raise _scan_based_error(empty_pages, total_to_extract)
         
         # Log progress every 500 pages for large PDFs
         if (i + 1) % 500 == 0:
@@ -87,24 +136,189 @@ def extract_text_from_pdf(
     total_extracted = len(page_texts)
     empty_ratio = empty_pages / total_extracted if total_extracted > 0 else 1.0
     
-    if empty_ratio > 0.5:
-        raise ScanBasedPDFError(
-            f"This PDF appears to be scan-based (image-only). "
-            f"{empty_pages}/{total_extracted} pages ({empty_ratio:.0%}) have no extractable text. "
-            f"Please use OCR software to convert scanned images to text first."
-        )
+    if empty_ratio > SCAN_EMPTY_RATIO:
+        raise _scan_based_error(empty_pages, total_extracted)
     
     if empty_pages > 0:
         log_message(f"Warning: {empty_pages} pages had minimal/no text")
     
-    full_text = "\n\n".join(page_texts)
-    log_message(f"Extracted {len(full_text)} characters from {total_extracted} pages")
+    total_chars = sum(map(len, page_texts)) + 2 * max(total_extracted - 1, 0)
+    log_message(f"Extracted {total_chars} characters from {total_extracted} pages")
     
-    return full_text, page_texts
+    if cache_path is not None:
+        _store_cached_pages(cache_path, page_texts)
+    
+    return page_texts
+
+
+def clear_extraction_cache(cache_dir: Path):
+    """Delete all cached extractions in cache_dir (used by --overwrite)."""
+    if not cache_dir.is_dir():
+        return
+    for entry in cache_dir.iterdir():
+        if entry.name.startswith(_CACHE_PREFIX) and entry.is_file():
+            entry.unlink()
+
+
+def _engine_version(engine: str) -> Optional[str]:
+    """
+    Installed version of an extraction engine, or None if it's missing.
+    
+    Read from package metadata so the engine itself isn't imported; frozen
+    builds may ship without metadata, so fall back to the module then.
+    """
+    try:
+        return metadata.version(PDF_ENGINES[engine])
+    except metadata.PackageNotFoundError:
+        pass
+    try:
+        if engine == "pymupdf":
+            import fitz
+            return fitz.VersionBind
+        from pypdf import __version__
+        return __version__
+    except ImportError:
+        return None
+
+
+def _extractor_id(engine: str) -> str:
+    """Name and version of the extraction engine, so upgrades invalidate the cache."""
+    return f"{engine}-{_engine_version(engine)}"
+
+
+def _cache_name(pdf_path: Path, start_page: int, end_page: int, engine: str) -> str:
+    """Build the cache file name for a PDF fingerprint, page range and extractor."""
+    stat = pdf_path.stat()
+    key = f"{pdf_path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{start_page}|{end_page}|{_extractor_id(engine)}"
+    suffix = ".msgpack" if msgpack is not None else ".json"
+    return _CACHE_PREFIX + hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest() + suffix
+
+
+def _load_cached_pages(cache_path: Path) -> Optional[List[str]]:
+    """Load cached page texts, or None if missing or unreadable."""
+    try:
+        data = cache_path.read_bytes()
+    except OSError:
+        return None
+    try:
+        if msgpack is not None:
+            return msgpack.unpackb(data)
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+def _store_cached_pages(cache_path: Path, page_texts: List[str]):
+    """
+    Write page texts to the cache; failures only cost a re-extract later.
+    
+    Older entries are removed first, so the cache never holds more than one
+    extraction (a changed PDF or page range replaces it instead of piling up).
+    """
+    if msgpack is not None:
+        data = msgpack.packb(page_texts)
+    elif orjson is not None:
+        data = orjson.dumps(page_texts)
+    else:
+        data = json.dumps(page_texts, ensure_ascii=False).encode("utf-8")
+    
+    tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+    try:
+        clear_extraction_cache(cache_path.parent)
+        ensure_dir(cache_path.parent)
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        log_message(f"Warning: Could not write extraction cache: {e}")
+
+
+def _iter_page_range(path: str, first: int, last: int, engine: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Yield (stripped_text, error_message) per page; error is None on success.
+    
+    Args:
+        path: Path to PDF file
+        first: First page (0-indexed)
+        last: End page (exclusive)
+        engine: "pypdf" or "pymupdf"
+    """
+    if engine == "pymupdf":
+        import fitz  # Only loaded when explicitly chosen
+        
+        with fitz.open(path) as doc:
+            for page_num in range(first, last):
+                try:
+                    text = (doc[page_num].get_text() or "").strip()
+                except Exception as e:
+                    yield "", str(e)
+                    continue
+                yield text, None
+        return
+    
+    from pypdf import PdfReader
+    
+    reader = PdfReader(path)
+    for page_num in range(first, last):
+        try:
+            text = (reader.pages[page_num].extract_text() or "").strip()
+        except Exception as e:
+            yield "", str(e)
+            continue
+        yield text, None
+
+
+def _extract_page_range(args: Tuple[str, int, int, str]) -> List[Tuple[str, Optional[str]]]:
+    """Extract a contiguous block of pages (runs in a worker process)."""
+    return list(_iter_page_range(*args))
+
+
+def _iter_page_results(pdf_path: Path, first: int, last: int, engine: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Yield (text, error) for pages first..last-1 in order.
+    
+    Large ranges are split into blocks and extracted across processes;
+    each worker opens the PDF once per block rather than once per page.
+    Closing the generator early cancels blocks that haven't started.
+    """
+    page_count = last - first
+    workers = min(os.cpu_count() or 1, page_count // PARALLEL_MIN_PAGES)
+    
+    if workers < 2:
+        yield from _iter_page_range(str(pdf_path), first, last, engine)
+        return
+    
+    # Several blocks per worker so an image-heavy stretch doesn't stall one core
+    block_size = max(16, -(-page_count // (workers * 4)))
+    blocks = [(str(pdf_path), lo, min(lo + block_size, last), engine)
+              for lo in range(first, last, block_size)]
+    
+    # spawn (the Windows default) everywhere: forking after the API client
+    # has started its gRPC threads can deadlock the children
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    futures = [executor.submit(_extract_page_range, block) for block in blocks]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _scan_based_error(empty_pages: int, checked_pages: int) -> ScanBasedPDFError:
+    """Build the error raised for image-only PDFs."""
+    empty_ratio = empty_pages / checked_pages if checked_pages > 0 else 1.0
+    return ScanBasedPDFError(
+        f"This PDF appears to be scan-based (image-only). "
+        f"{empty_pages}/{checked_pages} pages ({empty_ratio:.0%}) have no extractable text. "
+        f"Please use OCR software to convert scanned images to text first."
+    )
 
 
 def get_pdf_info(pdf_path: Path) -> dict:
     """Get basic PDF metadata."""
+    from pypdf import PdfReader
+    
     try:
         reader = PdfReader(str(pdf_path))
         metadata = reader.metadata or {}
@@ -1,8 +1,10 @@
 """Text preprocessing module for fixing PDF-converted text issues."""
 
+import random
 import re
-from typing import List, Set
+from typing import List, Optional, Set
 from collections import Counter
+from itertools import chain
 
 from .utils import log_message
 
@@ -13,33 +15,40 @@ SENTENCE_ENDINGS = set('.!?…:;"\'"」』】）)]\u201d\u201c')
 # Characters that indicate line should NOT be joined
 LINE_START_BLOCK = set('•·●○◆◇■□▪▫–—-')
 
+# Page number lines: "1", "- 1 -", "Page 1", "Trang 1" (one alternation, one scan)
+_PAGE_NUMBER_RE = re.compile(
+    r'^\s*(?:\d+|[-—–]\s*\d+\s*[-—–]|(?:Page|Trang|p\.?)\s*\d+)\s*$',
+    re.IGNORECASE
+)
+
+# Chương N: Title, CHƯƠNG N - Title, Chương N. Title, Chương N (no title), etc.
+_CHAPTER_HEADING_RE = re.compile(r'^\s*chương\s+\d{1,5}\s*(?:[:：.\-–—]|$)', re.IGNORECASE)
+
+# Chương N followed by a separator and a title, anywhere in the text
+_CHAPTER_TITLE_RE = re.compile(r'(Chương|CHƯƠNG|chương)\s+(\d{1,5})\s*[:：\-–]\s*(.+?)(?=\n|$)', re.MULTILINE)
+
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
 
 def normalize_newlines(text: str) -> str:
     """Convert all newline variants to unix-style \\n."""
+    if '\r' not in text:  # Common case: nothing to replace, no copies
+        return text
     return text.replace('\r\n', '\n').replace('\r', '\n')
 
 
 def is_page_number_line(line: str) -> bool:
     """Check if line is just a page number."""
-    stripped = line.strip()
-    # Match patterns like: "1", "- 1 -", "Page 1", "Trang 1"
-    patterns = [
-        r'^\s*\d+\s*$',  # Just number
-        r'^\s*[-—–]\s*\d+\s*[-—–]\s*$',  # - 1 -
-        r'^\s*(Page|Trang|p\.?)\s*\d+\s*$',  # Page 1
-    ]
-    for pattern in patterns:
-        if re.match(pattern, stripped, re.IGNORECASE):
-            return True
-    return False
+    return _PAGE_NUMBER_RE.match(line.strip()) is not None
 
 
 def is_chapter_heading(line: str) -> bool:
     """Check if line looks like a chapter heading."""
     stripped = line.strip()
-    # Match: Chương N: Title, CHƯƠNG N - Title, Chương N. Title, Chương N (no title), etc.
-    pattern = r'^\s*chương\s+\d{1,5}\s*(?:[:：.\-–—]|$)'
-    return bool(re.match(pattern, stripped, re.IGNORECASE))
+    # Cheap literal prefilter: almost no line starts with "chương"
+    if stripped[:6].lower() != 'chương':
+        return False
+    return bool(_CHAPTER_HEADING_RE.match(stripped))
 
 
 def should_join_lines(current_line: str, next_line: str) -> bool:
@@ -54,14 +63,12 @@ def should_join_lines(current_line: str, next_line: str) -> bool:
     current = current_line.rstrip()
     next_stripped = next_line.strip()
     
+    # Checks run cheapest / most often decisive first; the heading regex last
+    
     # Don't join if either is empty
     if not current or not next_stripped:
         return False
     
-    # Don't join if either is a chapter heading
-    if is_chapter_heading(current) or is_chapter_heading(next_stripped):
-        return False
-    
     # Don't join if current ends with sentence-ending punctuation
     if current[-1] in SENTENCE_ENDINGS:
         return False
@@ -77,6 +84,10 @@ def should_join_lines(current_line: str, next_line: str) -> bool:
         # Could be start of new sentence, don't join
         return False
     
+    # Don't join if either is a chapter heading
+    if is_chapter_heading(current) or is_chapter_heading(next_stripped):
+        return False
+    
     # Join the lines
     return True
 
@@ -101,31 +112,20 @@ def find_repeating_headers_footers(page_texts: List[str], threshold: float = 0.3
     # For very large PDFs, sample pages instead of scanning all
     # This significantly improves performance for 6000+ page documents
     if total_pages > 200:
-        # Sample first 50, last 50, and 100 random pages from middle
-        import random
-        sample_indices = list(range(50)) + list(range(total_pages - 50, total_pages))
-        middle_range = list(range(50, total_pages - 50))
-        if len(middle_range) > 100:
-            sample_indices.extend(random.sample(middle_range, 100))
-        else:
-            sample_indices.extend(middle_range)
-        sample_indices = sorted(set(sample_indices))
-        sampled_pages = [page_texts[i] for i in sample_indices]
-        effective_total = len(sampled_pages)
+        # Sample first 50, last 50, and 100 random pages from middle. The fixed
+        # seed keeps the result, and so every prompt, identical across runs.
+        middle = random.Random(0).sample(range(50, total_pages - 50), k=min(100, total_pages - 100))
+        sample_indices = chain(range(50), range(total_pages - 50, total_pages), middle)
+        sampled_pages = (page_texts[i] for i in sample_indices)
+        effective_total = 100 + len(middle)
     else:
         sampled_pages = page_texts
         effective_total = total_pages
     
     # Count short lines (likely headers/footers) across sampled pages
     for page_text in sampled_pages:
-        seen_on_page: Set[str] = set()
-        for line in page_text.split('\n'):
-            stripped = line.strip()
-            # Only consider short lines (headers/footers are usually short)
-            if 3 <= len(stripped) <= 40:
-                if stripped not in seen_on_page:
-                    line_counts[stripped] += 1
-                    seen_on_page.add(stripped)
+        # Each distinct short line counts once per page (headers/footers are usually short)
+        line_counts.update({s for s in map(str.strip, page_text.split('\n')) if 3 <= len(s) <= 40})
     
     # Find lines appearing on >= threshold of pages
     min_count = int(effective_total * threshold)
@@ -144,15 +144,13 @@ def normalize_chapter_title(text: str) -> str:
     Handles: ":" or "：" or "-" or "–" and extra whitespace
     """
     # Normalize chapter heading separators
-    # Pattern: Chương N followed by separator
     def normalize_heading(match):
         chap_word = match.group(1)
         number = match.group(2)
         title = match.group(3).strip()
         return f"{chap_word} {number}: {title}"
     
-    pattern = r'(Chương|CHƯƠNG|chương)\s+(\d{1,5})\s*[:：\-–]\s*(.+?)(?=\n|$)'
-    text = re.sub(pattern, normalize_heading, text, flags=re.MULTILINE)
+    text = _CHAPTER_TITLE_RE.sub(normalize_heading, text)
     
     return text
 
@@ -170,6 +168,10 @@ def preprocess_text(text: str, page_texts: List[str] = None) -> str:
     """
     log_message("Starting text preprocessing...")
     
+    # Nothing survives the pipeline for empty / whitespace-only input
+    if not text or text.isspace():
+        return ""
+    
     # Step 1: Normalize newlines
     text = normalize_newlines(text)
     original_len = len(text)
@@ -181,49 +183,81 @@ def preprocess_text(text: str, page_texts: List[str] = None) -> str:
     
     # Step 3: Process line by line
     lines = text.split('\n')
+    last_index = len(lines) - 1
     processed_lines: List[str] = []
     
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.strip()
+    # Current line when it's already stripped: carried over from the
+    # previous iteration's lookahead, or the result of joining into it
+    pending: Optional[str] = None
+    pending_is_join = False
+    
+    # Joins of 3+ lines are kept as parts: re-concatenating the growing line
+    # on every join is quadratic for long unpunctuated runs
+    paragraph: Optional[List[str]] = None
+    paragraph_len = 0
+    
+    for i, line in enumerate(lines):
+        if paragraph is not None:
+            # A join of 3+ lines can't newly become a page number or chapter
+            # heading: that needs a digits-only middle line, and those are page
+            # numbers, never joined. So only the header check (headers are at
+            # most 40 chars) and the join test against the last part remain.
+            parts, paragraph = paragraph, None
+            if paragraph_len <= 40 and ' '.join(parts) in repeating_lines:
+                continue
+            if i < last_index:
+                next_stripped = lines[i + 1].strip()
+                if should_join_lines(parts[-1], next_stripped) and not _PAGE_NUMBER_RE.match(next_stripped):
+                    parts.append(next_stripped)
+                    paragraph = parts
+                    paragraph_len += 1 + len(next_stripped)
+                    continue
+                pending = next_stripped
+            processed_lines.append(' '.join(parts))
+            continue
         
+        stripped = line.strip() if pending is None else pending
+        is_join = pending_is_join
+        pending = None
+        pending_is_join = False
+
         # Skip page numbers
-        if is_page_number_line(stripped):
-            i += 1
+        if _PAGE_NUMBER_RE.match(stripped):
             continue
         
         # Skip repeating headers/footers
         if stripped in repeating_lines:
-            i += 1
             continue
         
         # Skip completely empty lines (but track for paragraph detection)
         if not stripped:
             # Keep one blank line for paragraph separation
-            if processed_lines and processed_lines[-1].strip():
+            if processed_lines and processed_lines[-1]:
                 processed_lines.append('')
-            i += 1
             continue
         
         # Check if we should join with next line
-        if i + 1 < len(lines):
-            next_line = lines[i + 1]
-            if should_join_lines(line, next_line) and not is_page_number_line(next_line.strip()):
-                # Join lines with a space
-                lines[i + 1] = stripped + ' ' + next_line.strip()
-                i += 1
+        if i < last_index:
+            next_stripped = lines[i + 1].strip()
+            if should_join_lines(stripped, next_stripped) and not _PAGE_NUMBER_RE.match(next_stripped):
+                if is_join:
+                    paragraph = [stripped, next_stripped]
+                    paragraph_len = len(stripped) + 1 + len(next_stripped)
+                else:
+                    # Join lines with a space; the result is checked again as the next line
+                    pending = stripped + ' ' + next_stripped
+                    pending_is_join = True
                 continue
+            pending = next_stripped
         
         processed_lines.append(stripped)
-        i += 1
     
     # Step 4: Join lines and normalize chapter titles
     result = '\n'.join(processed_lines)
     result = normalize_chapter_title(result)
     
     # Step 5: Clean up multiple blank lines
-    result = re.sub(r'\n{3,}', '\n\n', result)
+    result = _BLANK_LINES_RE.sub('\n\n', result)
     
     final_len = len(result)
     reduction = (1 - final_len / original_len) * 100 if original_len > 0 else 0
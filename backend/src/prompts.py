@@ -1,8 +1,6 @@
 """Prompt templates for AI polishing."""
 
 from typing import Optional
-import yaml
-import json
 from pathlib import Path
 
 from .chunking import Chunk, get_chunk_context
@@ -73,25 +71,20 @@ def get_system_prompt(mode: str) -> str:
         return SYSTEM_PROMPT_POLISH_VI
 
 
-def build_user_prompt(
-    chunk: Chunk,
-    style_content: str = "",
-    glossary_content: str = ""
-) -> str:
+def build_user_prompt_prefix(style_content: str = "", glossary_content: str = "") -> str:
     """
-    Build the user prompt for a chunk.
+    Render the style/glossary block shared by every chunk's prompt.
+    
+    Build this once per run and pass it to build_user_prompt.
     
     Args:
-        chunk: The text chunk to process
         style_content: YAML style configuration content
         glossary_content: JSON glossary content
         
     Returns:
-        Formatted prompt string
+        Prompt block ending with the "### TEXT TO EDIT:" header
     """
-    context = get_chunk_context(chunk)
-    
-    parts = [f"## {context}\n"]
+    parts = []
     
     if style_content:
         parts.append("### STYLE GUIDE:")
@@ -106,6 +99,19 @@ def build_user_prompt(
         parts.append("```\n")
     
     parts.append("### TEXT TO EDIT:")
-    parts.append(chunk.text)
     
     return "\n".join(parts)
+
+
+def build_user_prompt(chunk: Chunk, prefix: str) -> str:
+    """
+    Build the user prompt for a chunk.
+    
+    Args:
+        chunk: The text chunk to process
+        prefix: Shared block from build_user_prompt_prefix
+        
+    Returns:
+        Formatted prompt string
+    """
+    return f"## {get_chunk_context(chunk)}\n\n{prefix}\n{chunk.text}"
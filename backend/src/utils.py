@@ -1,52 +1,74 @@
 """Utility functions for the backend."""
 
 import hashlib
+import os
 import sys
+import threading
 from pathlib import Path
 from typing import Optional
 
 
 def calculate_file_hash(filepath: Path, algorithm: str = "sha256") -> str:
     """Calculate hash of a file for checkpoint validation."""
-    hasher = hashlib.new(algorithm)
     with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            hasher.update(chunk)
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: read loop runs in C
+            return hashlib.file_digest(f, algorithm).hexdigest()
+        
+        hasher = hashlib.new(algorithm)
+        buffer = bytearray(1 << 20)
+        view = memoryview(buffer)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
     return hasher.hexdigest()
 
 
 def get_file_size(filepath: Path) -> int:
     """Get file size in bytes."""
-    return filepath.stat().st_size
+    return os.path.getsize(filepath)
+
+
+# Protocol lines may come from worker threads (API retries, exports); the
+# WPF app parses stdout line by line, so each line is written whole under a lock
+_stdout_lock = threading.Lock()
+
+
+def _emit(line: str) -> None:
+    """Write one protocol line to stdout in a single write and flush it."""
+    with _stdout_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
 
 
 def log_status(stage: str, **kwargs) -> None:
     """Print STATUS line for WPF to parse."""
     parts = [f"{k}=\"{v}\"" for k, v in kwargs.items()]
-    print(f"STATUS stage={stage} {' '.join(parts)}", flush=True)
+    _emit(f"STATUS stage={stage} {' '.join(parts)}")
 
 
 def log_progress(percent: int, chapter: int, part: str) -> None:
     """Print PROGRESS line for WPF to parse."""
-    print(f"PROGRESS percent={percent} chapter={chapter} part={part}", flush=True)
+    _emit(f"PROGRESS percent={percent} chapter={chapter} part={part}")
 
 
 def log_message(message: str) -> None:
     """Print LOG line for WPF to parse."""
     # Escape quotes in message
     safe_message = message.replace('"', '\\"')
-    print(f'LOG message="{safe_message}"', flush=True)
+    _emit(f'LOG message="{safe_message}"')
 
 
 def log_done(outdir: str, docx: str) -> None:
     """Print DONE line for WPF to parse."""
-    print(f'DONE outdir="{outdir}" docx="{docx}"', flush=True)
+    _emit(f'DONE outdir="{outdir}" docx="{docx}"')
 
 
 def log_error(code: int, message: str) -> None:
     """Print ERROR line for WPF to parse."""
     safe_message = message.replace('"', '\\"')
-    print(f'ERROR code={code} message="{safe_message}"', flush=True)
+    _emit(f'ERROR code={code} message="{safe_message}"')
 
 
 def ensure_dir(path: Path) -> Path:
@@ -0,0 +1,148 @@
+"""Tests for the Vertex AI batch prediction path."""
+
+import json
+import sys
+import types
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.gemini_client import GeminiClient, GeminiClientError
+
+
+@pytest.fixture
+def sdk():
+    """Stub google.cloud.storage and vertexai.batch_prediction for the batch code."""
+    storage = types.ModuleType("google.cloud.storage")
+    storage.Client = MagicMock()
+    cloud = types.ModuleType("google.cloud")
+    cloud.storage = storage
+    batch_prediction = types.ModuleType("vertexai.batch_prediction")
+    batch_prediction.BatchPredictionJob = MagicMock()
+    vertexai = types.ModuleType("vertexai")
+    vertexai.batch_prediction = batch_prediction
+    
+    with patch.dict(sys.modules, {
+        "google.cloud": cloud,
+        "google.cloud.storage": storage,
+        "vertexai": vertexai,
+        "vertexai.batch_prediction": batch_prediction,
+    }):
+        yield types.SimpleNamespace(
+            storage_client=storage.Client.return_value,
+            job_cls=batch_prediction.BatchPredictionJob
+        )
+
+
+@pytest.fixture
+def client():
+    with patch.object(GeminiClient, '_init_vertex'):
+        client = GeminiClient(provider="vertex", project_id="p", model_name="gemini-2.5-flash",
+                              temperature=0.2, max_output_tokens=8192)
+    client._GenerativeModel = MagicMock()
+    client.set_system_instruction("SYSTEM")
+    return client
+
+
+class FakeJob:
+    """Batch job that ends after a given number of refresh() calls."""
+    
+    def __init__(self, refreshes=0, succeeded=True, output_location="gs://bucket/run/output/prediction-1"):
+        self._remaining = refreshes
+        self.has_succeeded = succeeded
+        self.output_location = output_location
+        self.error = "quota exhausted"
+        self.resource_name = "projects/p/locations/l/batchPredictionJobs/1"
+        self.cancelled = False
+        self.state = MagicMock()
+        self.state.name = "JOB_STATE_RUNNING"
+    
+    @property
+    def has_ended(self):
+        return self._remaining == 0
+    
+    def refresh(self):
+        self._remaining -= 1
+    
+    def cancel(self):
+        self.cancelled = True
+
+
+def _blob(name, lines):
+    blob = MagicMock()
+    blob.name = name
+    blob.download_as_text.return_value = "\n".join(json.dumps(line, ensure_ascii=False) for line in lines)
+    return blob
+
+
+def _record(prompt, *texts):
+    return {
+        "request": {"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+        "response": {"candidates": [{"content": {"parts": [{"text": t} for t in texts]}}]},
+    }
+
+
+class TestSubmitBatch:
+    """Test building and submitting the batch input."""
+    
+    def test_uploads_one_request_per_prompt(self, sdk, client):
+        job = client.submit_batch(["Câu một", "Câu hai"], "gs://bucket/run/")
+        
+        sdk.storage_client.bucket.assert_called_once_with("bucket")
+        sdk.storage_client.bucket.return_value.blob.assert_called_once_with("run/input.jsonl")
+        upload = sdk.storage_client.bucket.return_value.blob.return_value.upload_from_string
+        lines = [json.loads(line) for line in upload.call_args.args[0].split("\n")]
+        
+        assert [line["request"]["contents"][0]["parts"][0]["text"] for line in lines] == ["Câu một", "Câu hai"]
+        assert lines[0]["request"]["systemInstruction"] == {"parts": [{"text": "SYSTEM"}]}
+        assert lines[0]["request"]["generationConfig"] == {"temperature": 0.2, "maxOutputTokens": 8192}
+        
+        sdk.job_cls.submit.assert_called_once_with(
+            source_model="gemini-2.5-flash",
+            input_dataset="gs://bucket/run/input.jsonl",
+            output_uri_prefix="gs://bucket/run/output",
+        )
+        assert job is sdk.job_cls.submit.return_value
+    
+    def test_rejects_non_gcs_prefix(self, sdk, client):
+        with pytest.raises(GeminiClientError):
+            client.submit_batch(["x"], "/local/path")
+    
+    def test_upload_failure_is_client_error(self, sdk, client):
+        sdk.storage_client.bucket.side_effect = Exception("403 forbidden")
+        
+        with pytest.raises(GeminiClientError, match="Batch submission failed"):
+            client.submit_batch(["x"], "gs://bucket/run")
+
+
+class TestWaitBatch:
+    """Test polling the job and mapping results back to prompts."""
+    
+    def test_maps_results_and_skips_failed_requests(self, sdk, client):
+        failed = {
+            "request": {"contents": [{"role": "user", "parts": [{"text": "Câu hai"}]}]},
+            "status": "RESOURCE_EXHAUSTED",
+        }
+        sdk.storage_client.list_blobs.return_value = [
+            _blob("run/output/prediction-1/predictions.jsonl", [_record("Câu một", "Kết ", "quả"), failed]),
+            _blob("run/output/prediction-1/metadata.json", []),
+        ]
+        
+        results = client.wait_batch(FakeJob(refreshes=2), poll_interval=0)
+        
+        sdk.storage_client.list_blobs.assert_called_once_with("bucket", prefix="run/output/prediction-1")
+        assert results == {"Câu một": "Kết quả"}
+    
+    def test_failed_job_raises(self, sdk, client):
+        with pytest.raises(GeminiClientError, match="quota exhausted"):
+            client.wait_batch(FakeJob(succeeded=False), poll_interval=0)
+        sdk.storage_client.list_blobs.assert_not_called()
+    
+    def test_timeout_cancels_job(self, sdk, client, capsys):
+        """A job that never ends is cancelled and reported instead of polled forever."""
+        job = FakeJob(refreshes=-1)
+        
+        with pytest.raises(GeminiClientError, match="did not finish"):
+            client.wait_batch(job, poll_interval=0.01, timeout=0.05)
+        
+        assert job.cancelled
+        sdk.storage_client.list_blobs.assert_not_called()
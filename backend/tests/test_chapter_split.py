@@ -1,7 +1,7 @@
 """Tests for chapter splitting module."""
 
 import pytest
-from src.chapter_split import split_into_chapters, CHAPTER_PATTERN
+from src.chapter_split import split_into_chapters, iter_chapters, CHAPTER_PATTERN
 
 
 class TestChapterPattern:
@@ -54,6 +54,13 @@ class TestChapterPattern:
         assert match is not None
         assert match.group(1) == "10"
         assert match.group(2).strip() == "Thử Thách Mới"
+    
+    def test_unicode_leading_whitespace(self):
+        """NBSP / ideographic space before the heading (as pypdf emits) still match."""
+        text = "Mở đầu.\n\xa0Chương 3: Ba\nNội dung.\n\u3000Chương 5: Năm\nNội dung."
+        chapters = split_into_chapters(text)
+        assert [c.number for c in chapters] == [3, 5]
+        assert chapters[1].title == "Năm"
 
 
 class TestSplitIntoChapters:
@@ -115,6 +122,47 @@ Nội dung chương 1 ở đây.
         assert chapters[0].title == "Mở đầu"
         assert "Tiêu Dao" in chapters[0].text
         assert chapters[1].number == 1
+    
+    def test_chapter_text_is_stripped(self):
+        """Chapter text is stripped here so create_chunks need not re-strip it."""
+        text = "Chương 1: Một\n\n   Nội dung một.  \n\n\nChương 2: Hai\n\nNội dung hai.\n\n"
+        chapters = split_into_chapters(text)
+        
+        for chapter in chapters:
+            assert chapter.text == chapter.text.strip()
+    
+    def test_iter_chapters_is_lazy(self):
+        """iter_chapters should yield the same chapters one at a time."""
+        text = """Chương 1: Một
+
+Nội dung một.
+
+Chương 2: Hai
+
+Nội dung hai.
+"""
+        chapters_iter = iter_chapters(text)
+        
+        first = next(chapters_iter)
+        assert first.number == 1
+        assert first.text == "Nội dung một."
+        
+        rest = list(chapters_iter)
+        assert [c.number for c in rest] == [2]
+        assert rest[0].text == "Nội dung hai."
+    
+    def test_heading_count_logged_before_chapters(self, capsys):
+        """The heading count is reported up front; progress lines carry the total."""
+        text = "\n\n".join(f"Chương {n}: Tên\n\nNội dung {n}." for n in range(1, 101))
+        chapters_iter = iter_chapters(text)
+        
+        next(chapters_iter)
+        assert "Found 100 chapter headings" in capsys.readouterr().out
+        
+        list(chapters_iter)
+        progress = [line for line in capsys.readouterr().out.splitlines() if "Processed" in line]
+        assert progress == ['LOG message="Processed 50/100 chapters..."',
+                            'LOG message="Processed 100/100 chapters..."']
 
 
 class TestChapterPatternMultiline:
@@ -0,0 +1,126 @@
+"""Tests for checkpoint module."""
+
+import json
+
+import pytest
+from src.checkpoint import CheckpointManager
+from src.chunking import CHUNKER_VERSION
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "input.pdf"
+    path.write_bytes(b"fake pdf content")
+    return path
+
+
+def _init(manager, input_file, total_chunks=3, chunker_version=CHUNKER_VERSION):
+    return manager.initialize(
+        input_file=input_file,
+        mode="polish_vi",
+        model="gemini-2.5-flash",
+        max_chars=7000,
+        provider="studio",
+        total_chunks=total_chunks,
+        chunker_version=chunker_version
+    )
+
+
+class TestCheckpointWal:
+    """Test write-ahead log for completed chunks."""
+    
+    def test_resume_replays_wal(self, tmp_path, input_file):
+        """Chunks recorded only in the WAL should be restored on resume."""
+        checkpoint_path = tmp_path / "checkpoint.json"
+        chunks_dir = tmp_path / "chunks"
+        
+        manager = CheckpointManager(checkpoint_path, chunks_dir)
+        assert not _init(manager, input_file)
+        manager.mark_chunk_done("chap_0001_part_001", "Output 1")
+        
+        # Snapshot has not been rewritten yet
+        with open(checkpoint_path, encoding='utf-8') as f:
+            assert json.load(f)["chunks_done"] == []
+        assert manager.wal_path.exists()
+        
+        resumed = CheckpointManager(checkpoint_path, chunks_dir)
+        assert _init(resumed, input_file)
+        assert resumed.is_chunk_done("chap_0001_part_001")
+        assert resumed.get_progress() == (1, 3)
+    
+    def test_close_compacts_wal(self, tmp_path, input_file):
+        """close() should fold the WAL into checkpoint.json."""
+        checkpoint_path = tmp_path / "checkpoint.json"
+        manager = CheckpointManager(checkpoint_path, tmp_path / "chunks")
+        _init(manager, input_file)
+        manager.mark_chunk_done("chap_0001_part_001", "Output 1")
+        manager.close()
+        
+        assert not manager.wal_path.exists()
+        with open(checkpoint_path, encoding='utf-8') as f:
+            assert json.load(f)["chunks_done"] == ["chap_0001_part_001"]
+    
+    def test_flush_replaces_snapshot_atomically(self, tmp_path, input_file):
+        """flush() should leave a complete snapshot and no temp file."""
+        checkpoint_path = tmp_path / "checkpoint.json"
+        manager = CheckpointManager(checkpoint_path, tmp_path / "chunks")
+        _init(manager, input_file)
+        manager.mark_chunk_done("chap_0001_part_001", "Output 1")
+        manager.flush()
+        
+        assert not manager.wal_path.exists()
+        assert list(tmp_path.glob("*.tmp")) == []
+        with open(checkpoint_path, encoding='utf-8') as f:
+            assert json.load(f)["chunks_done"] == ["chap_0001_part_001"]
+
+
+class TestCheckpointInputHash:
+    """Test input fingerprinting on resume."""
+    
+    def test_resume_skips_hash_when_unchanged(self, tmp_path, input_file, monkeypatch):
+        """An unchanged input (same size and mtime) should not be re-hashed."""
+        checkpoint_path = tmp_path / "checkpoint.json"
+        _init(CheckpointManager(checkpoint_path, tmp_path / "chunks"), input_file)
+        
+        def fail_hash(path):
+            raise AssertionError("input should not be re-hashed")
+        monkeypatch.setattr("src.checkpoint.calculate_file_hash", fail_hash)
+        
+        assert _init(CheckpointManager(checkpoint_path, tmp_path / "chunks"), input_file)
+    
+    def test_changed_input_starts_fresh(self, tmp_path, input_file):
+        """A modified input should invalidate the checkpoint."""
+        checkpoint_path = tmp_path / "checkpoint.json"
+        _init(CheckpointManager(checkpoint_path, tmp_path / "chunks"), input_file)
+        
+        input_file.write_bytes(b"different pdf content!")
+        
+        assert not _init(CheckpointManager(checkpoint_path, tmp_path / "chunks"), input_file)
+
+
+class TestCheckpointChunkerVersion:
+    """Test that checkpoints from another chunker are not resumed."""
+    
+    def test_checkpoint_without_version_starts_fresh(self, tmp_path, input_file):
+        """A checkpoint written before chunker versioning is discarded."""
+        checkpoint_path = tmp_path / "checkpoint.json"
+        manager = CheckpointManager(checkpoint_path, tmp_path / "chunks")
+        _init(manager, input_file)
+        manager.mark_chunk_done("chap_0001_part_001", "Output 1")
+        manager.close()
+        
+        data = json.loads(checkpoint_path.read_text(encoding='utf-8'))
+        del data["chunker_version"]
+        checkpoint_path.write_text(json.dumps(data), encoding='utf-8')
+        
+        resumed = CheckpointManager(checkpoint_path, tmp_path / "chunks")
+        assert not _init(resumed, input_file)
+        assert not resumed.is_chunk_done("chap_0001_part_001")
+    
+    def test_other_version_starts_fresh(self, tmp_path, input_file):
+        checkpoint_path = tmp_path / "checkpoint.json"
+        _init(CheckpointManager(checkpoint_path, tmp_path / "chunks"), input_file,
+              chunker_version=CHUNKER_VERSION - 1)
+        
+        assert not _init(CheckpointManager(checkpoint_path, tmp_path / "chunks"), input_file)
+        assert _init(CheckpointManager(checkpoint_path, tmp_path / "chunks"), input_file)
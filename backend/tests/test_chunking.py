@@ -139,3 +139,11 @@ class TestChunkSizeLimit:
             # Allow 10% tolerance for edge cases
             assert len(chunk.text) <= max_chars * 1.1, \
                 f"Chunk {chunk.chunk_id} exceeds limit: {len(chunk.text)} > {max_chars}"
+    
+    def test_chunk_fills_exactly_to_limit(self):
+        """A chunk whose joined length equals max_chars should not be split."""
+        text = "\n\n".join(["A" * 98, "B" * 98, "C" * 100])
+        
+        chunks = split_by_paragraphs(text, max_chars=len(text))
+        
+        assert chunks == [text]
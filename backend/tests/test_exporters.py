@@ -0,0 +1,46 @@
+"""Tests for exporters module."""
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from src.chunking import Chunk
+from src.exporters import export_to_docx
+
+
+def _export(tmp_path, output_text):
+    chunk = Chunk(
+        chapter_number=1,
+        chapter_title="Mở Đầu",
+        part_number=1,
+        total_parts=1,
+        text="original",
+        chunk_id="chap_0001_part_001"
+    )
+    chunks_dir = tmp_path / "chunks"
+    chunks_dir.mkdir()
+    (chunks_dir / f"{chunk.chunk_id}.md").write_text(output_text, encoding="utf-8")
+    return export_to_docx([chunk], chunks_dir, tmp_path / "out.docx")
+
+
+class TestDocxBodyParagraphs:
+    """Test the raw-XML body paragraphs written by export_to_docx."""
+    
+    def test_tabs_and_spaces_round_trip(self, tmp_path):
+        """Tabs become <w:tab/> and spaces beside them are preserved."""
+        body = "Cột một \tcột hai\t\t cột ba"
+        doc = Document(str(_export(tmp_path, f"Đoạn đầu.\n\n{body}")))
+        
+        paragraph = doc.paragraphs[-1]
+        assert paragraph.text == body
+        
+        run = paragraph._p.r_lst[0]
+        assert len(run.findall(qn("w:tab"))) == 3
+        texts = run.findall(qn("w:t"))
+        assert [t.text for t in texts] == ["Cột một ", "cột hai", " cột ba"]
+        assert all(t.get(qn("xml:space")) == "preserve" for t in texts)
+    
+    def test_plain_paragraphs(self, tmp_path):
+        """Each blank-line separated paragraph is one body paragraph; line breaks become spaces."""
+        doc = Document(str(_export(tmp_path, "Dòng một\ndòng hai.\n\nĐoạn hai.")))
+        
+        assert [p.text for p in doc.paragraphs[-2:]] == ["Dòng một dòng hai.", "Đoạn hai."]
@@ -0,0 +1,110 @@
+"""Tests for Gemini client retry handling."""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from src.gemini_client import GeminiClient, GeminiClientError, TokenBucket, _server_retry_after
+
+
+@pytest.fixture
+def client():
+    with patch.object(GeminiClient, '_init_studio'):
+        client = GeminiClient(provider="studio")
+    client._model = MagicMock()
+    return client
+
+
+class TestServerRetryAfter:
+    """Test parsing of server-suggested retry delays."""
+    
+    def test_retry_in_seconds(self):
+        assert _server_retry_after(Exception("429 Quota exceeded. Please retry in 12.5s.")) == 12.5
+    
+    def test_retry_delay_block(self):
+        assert _server_retry_after(Exception("429 quota\nretry_delay {\n  seconds: 7\n}")) == 7.0
+    
+    def test_no_hint(self):
+        assert _server_retry_after(Exception("500 Internal error")) is None
+
+
+class TestGenerateRetry:
+    """Test retry loop behaviour."""
+    
+    def test_retries_rate_limit_then_succeeds(self, client):
+        response = MagicMock(text="polished")
+        client._model.generate_content.side_effect = [
+            Exception("429 Please retry in 0.01s"),
+            response,
+        ]
+        
+        assert client.generate("prompt", retry_delay=0.01) == "polished"
+        assert client._model.generate_content.call_count == 2
+    
+    def test_non_retryable_error_raises(self, client):
+        client._model.generate_content.side_effect = Exception("400 invalid argument")
+        
+        with pytest.raises(GeminiClientError):
+            client.generate("prompt", retry_delay=0.01)
+        assert client._model.generate_content.call_count == 1
+
+    
+    def test_warm_up_ignores_errors(self, client):
+        client._model.count_tokens.side_effect = Exception("503 unavailable")
+        
+        client.warm_up()
+        client._model.count_tokens.assert_called_once()
+        client._model.generate_content.assert_not_called()
+
+
+class TestResponseCache:
+    """Test the prompt-hash response cache."""
+    
+    def test_cached_response_skips_api(self, tmp_path):
+        from src.llm_cache import LLMCache
+        
+        cache = LLMCache(tmp_path / "llm_cache.sqlite")
+        with patch.object(GeminiClient, '_init_studio'):
+            client = GeminiClient(provider="studio", cache=cache)
+        client._model = MagicMock()
+        client._model.generate_content.return_value = MagicMock(text="polished")
+        
+        assert client.generate("prompt") == "polished"
+        assert client.generate("prompt") == "polished"
+        assert client._model.generate_content.call_count == 1
+        
+        client.generate("other prompt")
+        assert client._model.generate_content.call_count == 2
+        cache.close()
+    
+    def test_clear_forgets_responses(self, tmp_path):
+        from src.llm_cache import LLMCache
+        
+        cache = LLMCache(tmp_path / "llm_cache.sqlite")
+        key = LLMCache.make_key("model", "prompt")
+        cache.put(key, "old output")
+        cache.clear()
+        
+        assert cache.get(key) is None
+        cache.close()
+
+
+class TestTokenBucket:
+    """Test request pacing."""
+    
+    def test_burst_then_paced(self):
+        async def run():
+            bucket = TokenBucket(rate_per_min=1200, capacity=2)  # 20/s
+            start = time.monotonic()
+            for _ in range(4):
+                await bucket.acquire()
+            return time.monotonic() - start
+        
+        # Two tokens are free, the other two wait ~50ms each
+        elapsed = asyncio.run(run())
+        assert 0.08 <= elapsed < 0.5
+    
+    def test_rejects_non_positive_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate_per_min=0)
@@ -0,0 +1,192 @@
+"""Tests for the chunk processing loops in main."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from src.chunking import Chunk
+from src.gemini_client import GeminiClientError
+from src.main import process_chunks_async, process_chunks_batch
+
+
+def _chunks(count):
+    return [
+        Chunk(
+            chapter_number=1,
+            chapter_title="Test",
+            part_number=i + 1,
+            total_parts=count,
+            text=f"body-{i}",
+            chunk_id=f"chap_0001_part_{i + 1:03d}"
+        )
+        for i in range(count)
+    ]
+
+
+class FakeClient:
+    """Answers each prompt after a per-chunk delay; optionally fails one chunk."""
+    
+    def __init__(self, delays, fail_index=None):
+        self.delays = delays
+        self.fail_index = fail_index
+    
+    async def generate_async(self, prompt):
+        index = int(prompt.rsplit("body-", 1)[1])
+        await asyncio.sleep(self.delays[index])
+        if index == self.fail_index:
+            raise GeminiClientError("500 boom")
+        return f"out-{index}"
+
+
+class BlockingClient:
+    """Answers through the loop's default executor, like GeminiClient; records peak parallelism."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+    
+    def _generate(self, prompt):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.2)
+        with self.lock:
+            self.active -= 1
+        return "out"
+    
+    async def generate_async(self, prompt):
+        return await asyncio.get_running_loop().run_in_executor(None, self._generate, prompt)
+
+
+class FakeCheckpoint:
+    """Records mark_chunk_done calls in order."""
+    
+    def __init__(self):
+        self.done = []
+    
+    def mark_chunk_done(self, chunk_id, output_text):
+        self.done.append((chunk_id, output_text))
+
+
+def _run(chunks, client, checkpoint):
+    asyncio.run(process_chunks_async(
+        chunks,
+        client,
+        checkpoint,
+        "PREFIX",
+        concurrency=len(chunks),
+        rpm=0,
+        processed_count=0,
+        total_chunks=len(chunks)
+    ))
+
+
+class TestProcessChunksAsync:
+    """Test ordering and failure handling of concurrent chunk processing."""
+    
+    def test_checkpoint_order_follows_chunk_order(self, capsys):
+        """Responses finishing out of order are still saved in chunk order."""
+        chunks = _chunks(4)
+        checkpoint = FakeCheckpoint()
+        _run(chunks, FakeClient([0.04, 0.01, 0.03, 0.0]), checkpoint)
+        
+        assert checkpoint.done == [(c.chunk_id, f"out-{i}") for i, c in enumerate(chunks)]
+        
+        percents = [int(line.split()[1].split("=")[1])
+                    for line in capsys.readouterr().out.splitlines() if line.startswith("PROGRESS")]
+        assert percents == [25, 50, 75, 100]
+    
+    def test_failed_chunk_saves_buffered_results(self, capsys):
+        """A failure keeps finished later chunks and reports one ERROR."""
+        chunks = _chunks(3)
+        checkpoint = FakeCheckpoint()
+        
+        with pytest.raises(GeminiClientError):
+            _run(chunks, FakeClient([0.05, 0.0, 0.01], fail_index=0), checkpoint)
+        
+        assert checkpoint.done == [(chunks[1].chunk_id, "out-1"), (chunks[2].chunk_id, "out-2")]
+        
+        errors = [line for line in capsys.readouterr().out.splitlines() if line.startswith("ERROR")]
+        assert len(errors) == 1
+        assert chunks[0].chunk_id in errors[0]
+    
+    def test_concurrency_not_capped_by_cpu_count(self, capsys):
+        """All `concurrency` blocking requests run at once, whatever the core count."""
+        chunks = _chunks(40)
+        client = BlockingClient()
+        _run(chunks, client, FakeCheckpoint())
+        
+        assert client.peak == 40
+
+
+class FakeBatchClient:
+    """Answers every submitted prompt except those at the given indexes; cache is a prompt dict."""
+    
+    def __init__(self, missing=(), cache=None):
+        self.missing = set(missing)
+        self.cache = cache if cache is not None else {}
+        self.prompts = None
+    
+    def cached_response(self, prompt):
+        return self.cache.get(prompt)
+    
+    def cache_response(self, prompt, text):
+        self.cache[prompt] = text
+    
+    def submit_batch(self, prompts, gcs_prefix):
+        self.prompts = prompts
+        return "job"
+    
+    def wait_batch(self, job, timeout):
+        return {
+            prompt: f"out-{prompt.rsplit('body-', 1)[1]}"
+            for i, prompt in enumerate(self.prompts) if i not in self.missing
+        }
+
+
+class TestProcessChunksBatch:
+    """Test mapping batch results back to chunks."""
+    
+    def test_results_saved_in_chunk_order(self, capsys):
+        chunks = _chunks(3)
+        checkpoint = FakeCheckpoint()
+        
+        process_chunks_batch(chunks, FakeBatchClient(), checkpoint, "PREFIX", "gs://b/p",
+                             processed_count=0, total_chunks=3)
+        
+        assert checkpoint.done == [(c.chunk_id, f"out-{i}") for i, c in enumerate(chunks)]
+    
+    def test_missing_result_leaves_chunk_pending(self, capsys):
+        """Chunks without a result aren't checkpointed, and the job is reported as incomplete."""
+        chunks = _chunks(3)
+        checkpoint = FakeCheckpoint()
+        
+        with pytest.raises(GeminiClientError, match=chunks[1].chunk_id):
+            process_chunks_batch(chunks, FakeBatchClient(missing={1}), checkpoint, "PREFIX", "gs://b/p",
+                                 processed_count=0, total_chunks=3)
+        
+        assert checkpoint.done == [(chunks[0].chunk_id, "out-0"), (chunks[2].chunk_id, "out-2")]
+    
+    def test_cached_chunks_are_not_resubmitted(self, capsys):
+        """A re-run only submits chunks without a cached response, and caches new results."""
+        chunks = _chunks(3)
+        first = FakeBatchClient(missing={1})
+        
+        with pytest.raises(GeminiClientError):
+            process_chunks_batch(chunks, first, FakeCheckpoint(), "PREFIX", "gs://b/p",
+                                 processed_count=0, total_chunks=3)
+        
+        retry = FakeBatchClient(cache=first.cache)
+        checkpoint = FakeCheckpoint()
+        process_chunks_batch(chunks, retry, checkpoint, "PREFIX", "gs://b/p",
+                             processed_count=0, total_chunks=3)
+        
+        assert [p.rsplit("body-", 1)[1] for p in retry.prompts] == ["1"]
+        assert checkpoint.done == [(c.chunk_id, f"out-{i}") for i, c in enumerate(chunks)]
+        
+        cached_only = FakeBatchClient(cache=retry.cache)
+        process_chunks_batch(chunks, cached_only, FakeCheckpoint(), "PREFIX", "gs://b/p",
+                             processed_count=0, total_chunks=3)
+        assert cached_only.prompts is None
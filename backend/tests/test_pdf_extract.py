@@ -0,0 +1,195 @@
+"""Tests for PDF extraction module."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from src import pdf_extract
+from src.pdf_extract import (
+    PDFExtractionError,
+    ScanBasedPDFError,
+    clear_extraction_cache,
+    extract_text_from_pdf,
+)
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    def make(pages):
+        path = tmp_path / "book.pdf"
+        writer = PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(100, 100)
+        with open(path, "wb") as f:
+            writer.write(f)
+        return path
+    return make
+
+
+@pytest.fixture
+def make_text_pdf(tmp_path):
+    """Write a PDF whose page i (0-indexed) reads "Page i+1 line j ..." on three lines."""
+    def make(pages):
+        path = tmp_path / "text.pdf"
+        writer = PdfWriter()
+        font = writer._add_object(DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+        }))
+        for i in range(pages):
+            page = writer.add_blank_page(612, 792)
+            content = DecodedStreamObject()
+            content.set_data("".join(
+                f"BT /F1 12 Tf 72 {700 - j * 14} Td (Page {i + 1} line {j} of the book) Tj ET\n"
+                for j in range(3)
+            ).encode())
+            page[NameObject("/Contents")] = writer._add_object(content)
+            page[NameObject("/Resources")] = DictionaryObject({
+                NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+            })
+        with open(path, "wb") as f:
+            writer.write(f)
+        return path
+    return make
+
+
+def _fake_pages(monkeypatch, texts):
+    """Serve page texts from a list instead of parsing the PDF; returns the pages-read log."""
+    served = []
+    
+    def fake_iter(pdf_path, first, last, engine):
+        for page_num in range(first, last):
+            served.append(page_num)
+            yield texts[page_num], None
+    
+    monkeypatch.setattr(pdf_extract, "_iter_page_results", fake_iter)
+    return served
+
+
+class TestScanDetection:
+    """Test detection of scan-based (image-only) PDFs."""
+    
+    def test_empty_front_matter_is_accepted(self, make_pdf, monkeypatch):
+        """Image-only opening pages don't fail a mostly-text PDF."""
+        texts = [""] * 45 + ["Nội dung trang sách đầy đủ."] * 255
+        _fake_pages(monkeypatch, texts)
+        
+        pages = extract_text_from_pdf(make_pdf(300), cache_dir=None)
+        assert len(pages) == 300
+    
+    def test_scan_pdf_fails_once_certain(self, make_pdf, monkeypatch):
+        """Extraction stops as soon as more than half of all pages are empty."""
+        served = _fake_pages(monkeypatch, [""] * 300)
+        
+        with pytest.raises(ScanBasedPDFError):
+            extract_text_from_pdf(make_pdf(300), cache_dir=None)
+        assert len(served) == 151
+
+
+class TestExtractionCache:
+    """Test the on-disk page text cache."""
+    
+    def test_hit_skips_extraction(self, make_pdf, monkeypatch, tmp_path):
+        """A second extraction of the same file is served from the cache."""
+        pdf_path = make_pdf(3)
+        cache_dir = tmp_path / "pdf_cache"
+        served = _fake_pages(monkeypatch, ["Trang một đầy đủ.", "Trang hai đầy đủ.", "Trang ba đầy đủ."])
+        
+        first = extract_text_from_pdf(pdf_path, cache_dir=cache_dir)
+        assert len(served) == 3
+        
+        second = extract_text_from_pdf(pdf_path, cache_dir=cache_dir)
+        assert second == first
+        assert len(served) == 3
+    
+    def test_miss_on_new_page_range_replaces_entry(self, make_pdf, monkeypatch, tmp_path):
+        """A different page range re-extracts and evicts the old entry."""
+        pdf_path = make_pdf(3)
+        cache_dir = tmp_path / "pdf_cache"
+        served = _fake_pages(monkeypatch, ["Trang một đầy đủ.", "Trang hai đầy đủ.", "Trang ba đầy đủ."])
+        
+        extract_text_from_pdf(pdf_path, cache_dir=cache_dir)
+        assert extract_text_from_pdf(pdf_path, start_page=2, cache_dir=cache_dir) == \
+            ["Trang hai đầy đủ.", "Trang ba đầy đủ."]
+        assert len(served) == 5
+        assert len(list(cache_dir.iterdir())) == 1
+    
+    def test_extractor_version_is_part_of_key(self, make_pdf, monkeypatch, tmp_path):
+        """Upgrading the extractor invalidates cached text."""
+        pdf_path = make_pdf(3)
+        cache_dir = tmp_path / "pdf_cache"
+        served = _fake_pages(monkeypatch, ["Trang một đầy đủ.", "Trang hai đầy đủ.", "Trang ba đầy đủ."])
+        
+        extract_text_from_pdf(pdf_path, cache_dir=cache_dir)
+        monkeypatch.setattr(pdf_extract, "_extractor_id", lambda engine: "pypdf-99.0")
+        extract_text_from_pdf(pdf_path, cache_dir=cache_dir)
+        assert len(served) == 6
+    
+    def test_clear_and_disabled_cache(self, make_pdf, monkeypatch, tmp_path):
+        """clear_extraction_cache forces a re-extract; cache_dir=None never writes."""
+        pdf_path = make_pdf(3)
+        cache_dir = tmp_path / "pdf_cache"
+        served = _fake_pages(monkeypatch, ["Trang một đầy đủ.", "Trang hai đầy đủ.", "Trang ba đầy đủ."])
+        
+        extract_text_from_pdf(pdf_path, cache_dir=cache_dir)
+        clear_extraction_cache(cache_dir)
+        assert list(cache_dir.iterdir()) == []
+        
+        extract_text_from_pdf(pdf_path, cache_dir=None)
+        assert list(cache_dir.iterdir()) == []
+        assert len(served) == 6
+
+
+class TestPageExtraction:
+    """Test the real extraction path against a generated text PDF."""
+    
+    def test_pages_extracted_in_order(self, make_text_pdf):
+        pages = extract_text_from_pdf(make_text_pdf(5), start_page=2, end_page=4, cache_dir=None)
+        
+        assert len(pages) == 3
+        for page_num, text in enumerate(pages, start=2):
+            assert text.startswith(f"Page {page_num} line 0")
+            assert f"Page {page_num} line 2 of the book" in text
+    
+    def test_worker_processes_match_serial(self, make_text_pdf, monkeypatch):
+        """Blocks extracted across processes come back complete and in page order."""
+        pdf_path = make_text_pdf(40)
+        serial = list(pdf_extract._iter_page_range(str(pdf_path), 0, 40, "pypdf"))
+        
+        monkeypatch.setattr(pdf_extract.os, "cpu_count", lambda: 2)
+        monkeypatch.setattr(pdf_extract, "PARALLEL_MIN_PAGES", 2)
+        parallel = list(pdf_extract._iter_page_results(pdf_path, 0, 40, "pypdf"))
+        
+        assert parallel == serial
+        assert all(error is None for _, error in parallel)
+        assert parallel[39][0].startswith("Page 40 line 0")
+    
+    def test_pymupdf_must_be_installed(self, make_text_pdf, monkeypatch):
+        """PyMuPDF is opt-in; asking for it without the package fails clearly."""
+        monkeypatch.setattr(pdf_extract, "_engine_version", lambda engine: None)
+        
+        with pytest.raises(PDFExtractionError, match="PyMuPDF"):
+            extract_text_from_pdf(make_text_pdf(1), cache_dir=None, engine="pymupdf")
+    
+    def test_cache_hit_does_not_import_engine(self, make_pdf, tmp_path):
+        """Serving from the cache never loads pypdf or PyMuPDF."""
+        pdf_path = make_pdf(3)
+        cache_dir = tmp_path / "pdf_cache"
+        cache_dir.mkdir()
+        cache_path = cache_dir / pdf_extract._cache_name(pdf_path, 1, 0, "pypdf")
+        pdf_extract._store_cached_pages(cache_path, ["Trang một đầy đủ."])
+        
+        code = (
+            "import sys; from pathlib import Path; from src.pdf_extract import extract_text_from_pdf; "
+            f"pages = extract_text_from_pdf(Path({str(pdf_path)!r}), cache_dir=Path({str(cache_dir)!r})); "
+            "assert pages == ['Trang một đầy đủ.'], pages; "
+            "assert 'pypdf' not in sys.modules and 'fitz' not in sys.modules"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parents[1],
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
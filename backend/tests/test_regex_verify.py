@@ -10,8 +10,8 @@ import sys
 
 # Regex mới (đã cập nhật) - same as in chapter_split.py
 REGEX_PATTERN = re.compile(
-    r'^\s*chương\s+(\d{1,5})\s*(?:[:：.\-–—]\s*(.+?))?\s*$',
-    re.IGNORECASE | re.MULTILINE
+    r'^[^\S\n]*[Cc][Hh][Ưư][Ơơ][Nn][Gg]\s+(\d{1,5})\s*(?:[:：.\-–—]\s*(.+?))?\s*$',
+    re.MULTILINE
 )
 
 test_cases = [
@@ -0,0 +1,57 @@
+"""Tests for utils module."""
+
+import threading
+
+from src.utils import log_error, log_message, log_progress
+
+
+class RecordingStdout:
+    """Stand-in for sys.stdout that records each write() call."""
+    
+    def __init__(self):
+        self.writes = []
+    
+    def write(self, data):
+        self.writes.append(data)
+        return len(data)
+    
+    def flush(self):
+        pass
+
+
+def test_each_log_line_is_one_write(monkeypatch):
+    """Every protocol line must reach stdout in a single write call."""
+    stdout = RecordingStdout()
+    monkeypatch.setattr("sys.stdout", stdout)
+    
+    log_message('say "hi"')
+    log_progress(50, 3, "1/2")
+    log_error(2, "boom")
+    
+    assert stdout.writes == [
+        'LOG message="say \\"hi\\""\n',
+        "PROGRESS percent=50 chapter=3 part=1/2\n",
+        'ERROR code=2 message="boom"\n',
+    ]
+
+
+def test_log_lines_stay_whole_across_threads(monkeypatch):
+    """Concurrent log calls must never interleave within a protocol line."""
+    stdout = RecordingStdout()
+    monkeypatch.setattr("sys.stdout", stdout)
+    
+    def worker(n):
+        for i in range(500):
+            if n % 2:
+                log_progress(i % 100, n, f"{i}/500")
+            else:
+                log_message(f"thread {n} line {i}")
+    
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(stdout.writes) == 2000
+    assert all(line.endswith("\n") and line.count("\n") == 1 for line in stdout.writes)